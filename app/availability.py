@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from bisect import bisect_right, insort
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy.orm import Session
+
+from . import models
+
+Interval = tuple[datetime, datetime]
+
+INDEX_MAX_AGE_SECONDS = float(os.getenv("AVAILABILITY_INDEX_MAX_AGE", "300"))
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> list[Interval]:
+    merged: list[Interval] = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def subtract_intervals(windows: list[Interval], blackouts: list[Interval]) -> list[Interval]:
+    free: list[Interval] = []
+    index = 0
+    for start, end in windows:
+        while index < len(blackouts) and blackouts[index][1] <= start:
+            index += 1
+        cursor = start
+        probe = index
+        while probe < len(blackouts) and blackouts[probe][0] < end:
+            blocked_start, blocked_end = blackouts[probe]
+            if blocked_start > cursor:
+                free.append((cursor, blocked_start))
+            cursor = max(cursor, blocked_end)
+            if cursor >= end:
+                break
+            probe += 1
+        if cursor < end:
+            free.append((cursor, end))
+    return free
+
+
+class UserAvailability:
+    def __init__(self) -> None:
+        self.windows: list[Interval] = []
+        self.blackouts: list[Interval] = []
+        self.free: list[Interval] = []
+        self.free_starts: list[datetime] = []
+
+    def add(self, start: datetime, end: datetime, available: bool) -> None:
+        if available:
+            insort(self.windows, (start, end))
+        else:
+            insort(self.blackouts, (start, end))
+
+    def rebuild(self) -> None:
+        self.windows = merge_intervals(self.windows)
+        self.blackouts = merge_intervals(self.blackouts)
+        self.free = subtract_intervals(self.windows, self.blackouts)
+        self.free_starts = [start for start, _ in self.free]
+
+    def is_free(self, start: datetime, end: datetime) -> bool:
+        position = bisect_right(self.free_starts, start) - 1
+        return position >= 0 and self.free[position][1] >= end
+
+
+class AvailabilityIndex:
+    def __init__(self, church_id: int) -> None:
+        self.church_id = church_id
+        self.users: dict[int, UserAvailability] = {}
+        self.loaded_at = time.monotonic()
+
+    @classmethod
+    def load(cls, db: Session, church_id: int) -> AvailabilityIndex:
+        index = cls(church_id)
+        rows = (
+            db.query(
+                models.Availability.user_id,
+                models.Availability.start_time,
+                models.Availability.end_time,
+                models.Availability.available,
+            )
+            .join(models.User, models.Availability.user_id == models.User.id)
+            .filter(models.User.church_id == church_id)
+            .all()
+        )
+        for user_id, start, end, available in rows:
+            index.users.setdefault(user_id, UserAvailability()).add(start, end, available)
+        for user in index.users.values():
+            user.rebuild()
+        return index
+
+    def add(self, user_id: int, start: datetime, end: datetime, available: bool) -> None:
+        user = UserAvailability()
+        current = self.users.get(user_id)
+        if current:
+            user.windows = list(current.windows)
+            user.blackouts = list(current.blackouts)
+        user.add(start, end, available)
+        user.rebuild()
+        # Swap in a new mapping so concurrent readers keep a consistent snapshot.
+        self.users = {**self.users, user_id: user}
+
+    def free_users(self, start: datetime, end: datetime) -> set[int]:
+        users = self.users
+        return {user_id for user_id, user in users.items() if user.is_free(start, end)}
+
+    def free_users_many(self, windows: list[Interval]) -> list[set[int]]:
+        users = self.users
+        intervals = sorted(
+            (start, end, user_id)
+            for user_id, user in users.items()
+            for start, end in user.free
+        )
+        results: list[set[int]] = [set() for _ in windows]
+        latest_end: dict[int, datetime] = {}
+        cursor = 0
+        for position in sorted(range(len(windows)), key=lambda item: windows[item][0]):
+            start, end = windows[position]
+            while cursor < len(intervals) and intervals[cursor][0] <= start:
+                _, interval_end, user_id = intervals[cursor]
+                latest_end[user_id] = interval_end
+                cursor += 1
+            results[position] = {
+                user_id for user_id, interval_end in latest_end.items() if interval_end >= end
+            }
+        return results
+
+
+_indexes: dict[int, AvailabilityIndex] = {}
+_lock = threading.Lock()
+
+
+def get_index(db: Session, church_id: int) -> AvailabilityIndex:
+    with _lock:
+        index = _indexes.get(church_id)
+        if index and time.monotonic() - index.loaded_at < INDEX_MAX_AGE_SECONDS:
+            return index
+    index = AvailabilityIndex.load(db, church_id)
+    with _lock:
+        _indexes[church_id] = index
+    return index
+
+
+def record_availability(db: Session, availability: models.Availability) -> None:
+    church_id = (
+        db.query(models.User.church_id).filter(models.User.id == availability.user_id).scalar()
+    )
+    with _lock:
+        index = _indexes.get(church_id)
+        if index:
+            index.add(
+                availability.user_id,
+                availability.start_time,
+                availability.end_time,
+                availability.available,
+            )
+
+
+def invalidate(church_id: int | None = None) -> None:
+    with _lock:
+        if church_id is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(church_id, None)
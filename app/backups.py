@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from . import models
+
+INDEX_MAX_AGE_SECONDS = float(os.getenv("BACKUP_INDEX_MAX_AGE", "300"))
+
+
+class BackupWindow:
+    def __init__(self, user_id: int, start: datetime, end: datetime, locations: list[str]) -> None:
+        self.user_id = user_id
+        self.start = start
+        self.end = end
+        self.locations = frozenset(locations or ())
+
+
+def _days(start: datetime, end: datetime) -> list[date]:
+    days = [start.date()]
+    while days[-1] < end.date():
+        days.append(days[-1] + timedelta(days=1))
+    return days
+
+
+class BackupIndex:
+    def __init__(self, church_id: int) -> None:
+        self.church_id = church_id
+        self.days: dict[date, list[BackupWindow]] = {}
+        self.loaded_at = time.monotonic()
+
+    @classmethod
+    def load(cls, db: Session, church_id: int) -> BackupIndex:
+        index = cls(church_id)
+        rows = (
+            db.query(
+                models.BackupPool.user_id,
+                models.BackupPool.start_time,
+                models.BackupPool.end_time,
+                models.BackupPool.preferred_locations,
+            )
+            .join(models.User, models.BackupPool.user_id == models.User.id)
+            .filter(models.User.church_id == church_id, models.BackupPool.active.is_(True))
+            .all()
+        )
+        for user_id, start, end, locations in rows:
+            window = BackupWindow(user_id, start, end, locations)
+            for day in _days(start, end):
+                index.days.setdefault(day, []).append(window)
+        return index
+
+    def add(self, window: BackupWindow) -> None:
+        days = dict(self.days)
+        for day in _days(window.start, window.end):
+            days[day] = [*days.get(day, []), window]
+        self.days = days
+
+    def covering(self, start: datetime, end: datetime) -> dict[int, frozenset[str]]:
+        covering: dict[int, frozenset[str]] = {}
+        for window in self.days.get(start.date(), ()):
+            if window.start <= start and window.end >= end:
+                covering[window.user_id] = covering.get(window.user_id, frozenset()) | window.locations
+        return covering
+
+
+_indexes: dict[int, BackupIndex] = {}
+_lock = threading.Lock()
+
+
+def get_index(db: Session, church_id: int) -> BackupIndex:
+    with _lock:
+        index = _indexes.get(church_id)
+        if index and time.monotonic() - index.loaded_at < INDEX_MAX_AGE_SECONDS:
+            return index
+    index = BackupIndex.load(db, church_id)
+    with _lock:
+        _indexes[church_id] = index
+    return index
+
+
+def record_backup(db: Session, pool: models.BackupPool) -> None:
+    if not pool.active:
+        return
+    church_id = db.query(models.User.church_id).filter(models.User.id == pool.user_id).scalar()
+    with _lock:
+        index = _indexes.get(church_id)
+        if index:
+            index.add(
+                BackupWindow(pool.user_id, pool.start_time, pool.end_time, pool.preferred_locations)
+            )
+
+
+def invalidate(church_id: int | None = None) -> None:
+    with _lock:
+        if church_id is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(church_id, None)
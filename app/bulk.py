@@ -0,0 +1,342 @@
+from __future__ import annotations
+
+import codecs
+import csv
+import io
+import json
+import os
+from typing import Any, AsyncIterator, Callable, Iterable, Iterator
+
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import Select, insert, select
+from sqlalchemy.orm import Session
+
+from . import availability, feeds, models, schemas, swaps
+from .database import SessionLocal
+
+CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+MAX_REPORTED_ERRORS = 1000
+
+NDJSON = "application/x-ndjson"
+CSV = "text/csv"
+
+
+def detect_format(request: Request, format: str | None) -> str:
+    if format:
+        value = format.lower()
+    else:
+        content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+        value = "csv" if content_type in (CSV, "application/csv") else "ndjson"
+    if value not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="Unsupported format")
+    return value
+
+
+async def _lines(request: Request) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    try:
+        async for chunk in request.stream():
+            buffer += decoder.decode(chunk)
+            *lines, buffer = buffer.split("\n")
+            for line in lines:
+                yield line + "\n"
+        buffer += decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Request body is not valid UTF-8")
+    if buffer:
+        yield buffer
+
+
+async def parse_rows(request: Request, format: str) -> AsyncIterator[tuple[int, Any]]:
+    if format == "ndjson":
+        number = 0
+        async for line in _lines(request):
+            number += 1
+            if not line.strip():
+                continue
+            try:
+                yield number, json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield number, ValueError(f"Invalid JSON: {exc.msg}")
+        return
+
+    header: list[str] | None = None
+    pending: list[str] = []
+    number = 0
+    async for line in _lines(request):
+        number += 1
+        pending.append(line)
+        record = "".join(pending)
+        # A quoted field may span lines; wait until the record is complete.
+        if record.count('"') % 2:
+            continue
+        pending = []
+        try:
+            parsed = list(csv.reader([record]))
+        except csv.Error as exc:
+            yield number, ValueError(f"Invalid CSV: {exc}")
+            continue
+        if not parsed:
+            continue
+        values = parsed[0]
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if not any(value.strip() for value in values):
+            continue
+        if len(values) != len(header):
+            yield number, ValueError("Column count does not match header")
+            continue
+        yield number, {name: value for name, value in zip(header, values) if value != ""}
+
+
+class ImportSpec:
+    def __init__(
+        self,
+        model: type[models.Base],
+        schema: type[BaseModel],
+        check: Callable[[Session, list[dict]], dict[int, str]],
+        key: str | None = None,
+        after: Callable[[set[int]], None] | None = None,
+    ) -> None:
+        self.model = model
+        self.schema = schema
+        self.check = check
+        self.key = key
+        self.after = after
+
+
+class ImportRun:
+    def __init__(self, spec: ImportSpec) -> None:
+        self.spec = spec
+        self.inserted = 0
+        self.failed = 0
+        self.errors: list[dict] = []
+        self.touched: set[int] = set()
+
+    def fail(self, line: int, messages: list[str]) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "errors": messages})
+
+    def insert_chunk(self, db: Session, chunk: list[tuple[int, dict]]) -> None:
+        rows = [row for _, row in chunk]
+        problems = self.spec.check(db, rows)
+        for position, message in problems.items():
+            self.fail(chunk[position][0], [message])
+        valid = [row for position, row in enumerate(rows) if position not in problems]
+        if not valid:
+            return
+        db.execute(insert(self.spec.model), valid)
+        self.inserted += len(valid)
+        if self.spec.key:
+            self.touched.update(row[self.spec.key] for row in valid)
+
+    def result(self) -> schemas.ImportResult:
+        return schemas.ImportResult(
+            inserted=self.inserted,
+            failed=self.failed,
+            errors=sorted(self.errors, key=lambda error: error["line"]),
+        )
+
+
+def _known_ids(db: Session, column, values: Iterable[int]) -> set[int]:
+    values = set(values)
+    if not values:
+        return set()
+    return set(db.scalars(select(column).where(column.in_(values))))
+
+
+def _check_events(db: Session, rows: list[dict]) -> dict[int, str]:
+    churches = _known_ids(db, models.Church.id, (row["church_id"] for row in rows))
+    errors: dict[int, str] = {}
+    for position, row in enumerate(rows):
+        if row["church_id"] not in churches:
+            errors[position] = "Unknown church_id"
+        elif row["end_time"] <= row["start_time"]:
+            errors[position] = "end_time must be after start_time"
+    return errors
+
+
+def _check_users(db: Session, rows: list[dict], seen_emails: set[str]) -> dict[int, str]:
+    churches = _known_ids(db, models.Church.id, (row["church_id"] for row in rows))
+    taken = {
+        email.lower()
+        for email in db.scalars(
+            select(models.User.email).where(models.User.email.in_([row["email"] for row in rows]))
+        )
+    }
+    errors: dict[int, str] = {}
+    for position, row in enumerate(rows):
+        email = row["email"].lower()
+        if row["church_id"] not in churches:
+            errors[position] = "Unknown church_id"
+        elif row["role"] not in models.Role.__members__:
+            errors[position] = "Unknown role"
+        elif email in taken or email in seen_emails:
+            errors[position] = "Email already exists"
+        else:
+            seen_emails.add(email)
+    return errors
+
+
+def _check_availability(db: Session, rows: list[dict]) -> dict[int, str]:
+    known = _known_ids(db, models.User.id, (row["user_id"] for row in rows))
+    errors: dict[int, str] = {}
+    for position, row in enumerate(rows):
+        if row["user_id"] not in known:
+            errors[position] = "Unknown user_id"
+        elif row["end_time"] <= row["start_time"]:
+            errors[position] = "end_time must be after start_time"
+    return errors
+
+
+def _after_events(church_ids: set[int]) -> None:
+    for church_id in church_ids:
+        feeds.cache.invalidate(church_id)
+
+
+def _after_availability(user_ids: set[int]) -> None:
+    db = SessionLocal()
+    try:
+        church_ids = set(
+            db.scalars(
+                select(models.User.church_id).where(models.User.id.in_(user_ids)).distinct()
+            )
+        )
+        swaps.prune_candidates(db, user_ids)
+        db.commit()
+    finally:
+        db.close()
+    for church_id in church_ids:
+        availability.invalidate(church_id)
+
+
+def import_spec(kind: str) -> ImportSpec:
+    if kind == "events":
+        return ImportSpec(
+            models.Event, schemas.EventCreate, _check_events, "church_id", _after_events
+        )
+    if kind == "users":
+        seen_emails: set[str] = set()
+        return ImportSpec(
+            models.User,
+            schemas.UserCreate,
+            lambda db, rows: _check_users(db, rows, seen_emails),
+        )
+    return ImportSpec(
+        models.Availability,
+        schemas.AvailabilityCreate,
+        _check_availability,
+        "user_id",
+        _after_availability,
+    )
+
+
+def _validation_messages(exc: ValidationError) -> list[str]:
+    return [
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+        for error in exc.errors()
+    ]
+
+
+async def import_rows(
+    request: Request,
+    kind: str,
+    format: str,
+    all_or_nothing: bool = False,
+) -> schemas.ImportResult:
+    spec = import_spec(kind)
+    run = ImportRun(spec)
+    chunk: list[tuple[int, dict]] = []
+    db = SessionLocal()
+    try:
+        async for number, row in parse_rows(request, format):
+            if isinstance(row, Exception):
+                run.fail(number, [str(row)])
+                continue
+            if not isinstance(row, dict):
+                run.fail(number, ["Expected an object"])
+                continue
+            try:
+                chunk.append((number, spec.schema(**row).dict()))
+            except ValidationError as exc:
+                run.fail(number, _validation_messages(exc))
+            if len(chunk) >= CHUNK_SIZE:
+                await run_in_threadpool(run.insert_chunk, db, chunk)
+                chunk = []
+        if chunk:
+            await run_in_threadpool(run.insert_chunk, db, chunk)
+        if run.failed and all_or_nothing:
+            await run_in_threadpool(db.rollback)
+            run.inserted = 0
+            run.touched.clear()
+        else:
+            await run_in_threadpool(db.commit)
+    except BaseException:
+        await run_in_threadpool(db.rollback)
+        raise
+    finally:
+        await run_in_threadpool(db.close)
+    if run.touched and spec.after:
+        await run_in_threadpool(spec.after, run.touched)
+    return run.result()
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return value
+
+
+def _export_lines(
+    statement: Select,
+    schema: type[BaseModel],
+    format: str,
+) -> Iterator[str]:
+    fields = list(schema.model_fields)
+    db = SessionLocal()
+    try:
+        rows = db.execute(statement.execution_options(yield_per=CHUNK_SIZE))
+        if format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, lineterminator="\n")
+            writer.writerow(fields)
+            for row in rows:
+                values = schema.model_validate(dict(row._mapping)).model_dump(mode="json")
+                writer.writerow([_csv_value(values[name]) for name in fields])
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue()
+        else:
+            for row in rows:
+                yield schema.model_validate(dict(row._mapping)).model_dump_json() + "\n"
+    finally:
+        db.close()
+
+
+def export_response(
+    model: type[models.Base],
+    schema: type[BaseModel],
+    format: str,
+    filename: str,
+    *criteria,
+) -> StreamingResponse:
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="Unsupported format")
+    table = model.__table__
+    statement = select(*table.c).where(*criteria).order_by(table.c.id)
+    media_type = f"{CSV}; charset=utf-8" if format == "csv" else NDJSON
+    return StreamingResponse(
+        _export_lines(statement, schema, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'},
+    )
@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import heapq
+from bisect import bisect_right
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import models, swaps
+
+EXPERIENCED_LEVEL = 2
+
+OVERLAP = "overlap"
+BLACKOUT = "blackout"
+EXPERIENCE = "experience"
+
+
+class Conflict:
+    def __init__(
+        self,
+        kind: str,
+        user_id: int,
+        event_id: int | None,
+        start_time: datetime,
+        end_time: datetime,
+        assignment_id: int | None = None,
+        other_assignment_id: int | None = None,
+        other_event_id: int | None = None,
+        blocked_from: datetime | None = None,
+        blocked_until: datetime | None = None,
+    ) -> None:
+        self.kind = kind
+        self.user_id = user_id
+        self.event_id = event_id
+        self.start_time = start_time
+        self.end_time = end_time
+        self.assignment_id = assignment_id
+        self.other_assignment_id = other_assignment_id
+        self.other_event_id = other_event_id
+        self.blocked_from = blocked_from
+        self.blocked_until = blocked_until
+
+    def describe(self) -> str:
+        if self.kind == OVERLAP:
+            return f"user {self.user_id} is already assigned to event {self.other_event_id}"
+        if self.kind == BLACKOUT:
+            return (
+                f"user {self.user_id} is unavailable from {self.blocked_from.isoformat()} "
+                f"to {self.blocked_until.isoformat()}"
+            )
+        return f"user {self.user_id} lacks the experience event {self.event_id} requires"
+
+
+class AssignmentConflict(Exception):
+    def __init__(self, conflicts: list[Conflict]) -> None:
+        super().__init__("; ".join(conflict.describe() for conflict in conflicts))
+        self.conflicts = conflicts
+
+
+def _merge(windows: Iterable[tuple[datetime, datetime]]) -> tuple[list[datetime], list[datetime]]:
+    starts: list[datetime] = []
+    ends: list[datetime] = []
+    for start, end in sorted(windows):
+        if ends and start <= ends[-1]:
+            ends[-1] = max(ends[-1], end)
+        else:
+            starts.append(start)
+            ends.append(end)
+    return starts, ends
+
+
+def _blackouts(
+    db: Session,
+    user_filter,
+    start_time: datetime | None = None,
+    end_time: datetime | None = None,
+) -> dict[int, tuple[list[datetime], list[datetime]]]:
+    query = select(
+        models.Availability.user_id, models.Availability.start_time, models.Availability.end_time
+    ).where(models.Availability.available.is_(False), user_filter)
+    if end_time is not None:
+        query = query.where(models.Availability.start_time < end_time)
+    if start_time is not None:
+        query = query.where(models.Availability.end_time > start_time)
+    windows: dict[int, list[tuple[datetime, datetime]]] = {}
+    for user_id, start, end in db.execute(query):
+        windows.setdefault(user_id, []).append((start, end))
+    return {user_id: _merge(items) for user_id, items in windows.items()}
+
+
+def _blocked(
+    blackouts: tuple[list[datetime], list[datetime]] | None, start: datetime, end: datetime
+) -> tuple[datetime, datetime] | None:
+    if not blackouts:
+        return None
+    starts, ends = blackouts
+    index = bisect_right(ends, start)
+    if index < len(starts) and starts[index] < end:
+        return starts[index], ends[index]
+    return None
+
+
+def find(
+    db: Session,
+    church_id: int,
+    start_time: datetime | None = None,
+    end_time: datetime | None = None,
+) -> list[Conflict]:
+    query = (
+        select(
+            models.Assignment.id,
+            models.Assignment.user_id,
+            models.Event.id,
+            models.Event.start_time,
+            models.Event.end_time,
+            models.Event.requires_experienced,
+            models.User.experience_level,
+        )
+        .join(models.Event, models.Assignment.event_id == models.Event.id)
+        .join(models.User, models.Assignment.user_id == models.User.id)
+        .where(models.Event.church_id == church_id)
+        .order_by(models.Assignment.user_id, models.Event.start_time, models.Assignment.id)
+    )
+    if start_time is not None:
+        query = query.where(models.Event.end_time > start_time)
+    if end_time is not None:
+        query = query.where(models.Event.start_time < end_time)
+    rows = db.execute(query).all()
+    blackouts = _blackouts(
+        db,
+        models.Availability.user_id.in_(
+            select(models.User.id).where(models.User.church_id == church_id)
+        ),
+        start_time,
+        end_time,
+    )
+
+    conflicts: list[Conflict] = []
+    active: list[tuple[datetime, int, int]] = []
+    current_user = None
+    for assignment_id, user_id, event_id, start, end, requires_experienced, level in rows:
+        if user_id != current_user:
+            current_user = user_id
+            active = []
+        # Rows arrive sorted by start, so anything still active overlaps this one.
+        while active and active[0][0] <= start:
+            heapq.heappop(active)
+        for _, other_assignment_id, other_event_id in sorted(active, key=lambda item: item[1]):
+            conflicts.append(
+                Conflict(
+                    OVERLAP,
+                    user_id,
+                    event_id,
+                    start,
+                    end,
+                    assignment_id,
+                    other_assignment_id,
+                    other_event_id,
+                )
+            )
+        heapq.heappush(active, (end, assignment_id, event_id))
+
+        blocked = _blocked(blackouts.get(user_id), start, end)
+        if blocked:
+            conflicts.append(
+                Conflict(
+                    BLACKOUT,
+                    user_id,
+                    event_id,
+                    start,
+                    end,
+                    assignment_id,
+                    blocked_from=blocked[0],
+                    blocked_until=blocked[1],
+                )
+            )
+        if requires_experienced and (level or 0) < EXPERIENCED_LEVEL:
+            conflicts.append(Conflict(EXPERIENCE, user_id, event_id, start, end, assignment_id))
+    conflicts.sort(key=lambda conflict: (conflict.start_time, conflict.user_id, conflict.kind))
+    return conflicts
+
+
+def check(
+    db: Session,
+    user_id: int,
+    event: models.Event,
+    exclude_assignment_id: int | None = None,
+) -> list[Conflict]:
+    conflicts: list[Conflict] = []
+    query = (
+        select(models.Assignment.id, models.Event.id)
+        .join(models.Event, models.Assignment.event_id == models.Event.id)
+        .where(
+            models.Assignment.user_id == user_id,
+            models.Event.start_time < event.end_time,
+            models.Event.end_time > event.start_time,
+        )
+        .order_by(models.Event.start_time, models.Assignment.id)
+    )
+    if exclude_assignment_id is not None:
+        query = query.where(models.Assignment.id != exclude_assignment_id)
+    for other_assignment_id, other_event_id in db.execute(query):
+        conflicts.append(
+            Conflict(
+                OVERLAP,
+                user_id,
+                event.id,
+                event.start_time,
+                event.end_time,
+                other_assignment_id=other_assignment_id,
+                other_event_id=other_event_id,
+            )
+        )
+    blocked = _blocked(
+        _blackouts(
+            db, models.Availability.user_id == user_id, event.start_time, event.end_time
+        ).get(user_id),
+        event.start_time,
+        event.end_time,
+    )
+    if blocked:
+        conflicts.append(
+            Conflict(
+                BLACKOUT,
+                user_id,
+                event.id,
+                event.start_time,
+                event.end_time,
+                blocked_from=blocked[0],
+                blocked_until=blocked[1],
+            )
+        )
+    if event.requires_experienced:
+        level = db.scalar(select(models.User.experience_level).where(models.User.id == user_id))
+        if (level or 0) < EXPERIENCED_LEVEL:
+            conflicts.append(
+                Conflict(EXPERIENCE, user_id, event.id, event.start_time, event.end_time)
+            )
+    return conflicts
+
+
+def guard(
+    db: Session,
+    user_id: int,
+    event: models.Event,
+    exclude_assignment_id: int | None = None,
+) -> None:
+    conflicts = check(db, user_id, event, exclude_assignment_id)
+    if conflicts:
+        raise AssignmentConflict(conflicts)
+
+
+def blocked_users(db: Session, event: models.Event, user_ids: Iterable[int]) -> set[int]:
+    user_ids = set(user_ids)
+    if not user_ids:
+        return set()
+    blocked = swaps.busy_users(db, event.start_time, event.end_time, user_ids)
+    blocked |= set(
+        db.scalars(
+            select(models.Availability.user_id).where(
+                models.Availability.user_id.in_(user_ids),
+                models.Availability.available.is_(False),
+                models.Availability.start_time < event.end_time,
+                models.Availability.end_time > event.start_time,
+            )
+        )
+    )
+    if event.requires_experienced:
+        blocked |= set(
+            db.scalars(
+                select(models.User.id).where(
+                    models.User.id.in_(user_ids),
+                    models.User.experience_level < EXPERIENCED_LEVEL,
+                )
+            )
+        )
+    return blocked
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from . import conflicts, models, recurrence, schemas
+
+
+def _event_rows(db: Session, church_id: int, start_time: datetime, end_time: datetime):
+    staffed = (
+        db.query(
+            models.Assignment.event_id,
+            func.count(models.Assignment.id).label("assigned"),
+            func.sum(
+                case((models.Assignment.status == models.AssignmentStatus.approved, 1), else_=0)
+            ).label("approved"),
+        )
+        .join(models.Event, models.Assignment.event_id == models.Event.id)
+        .filter(
+            models.Event.church_id == church_id,
+            models.Event.start_time >= start_time,
+            models.Event.start_time < end_time,
+        )
+        .group_by(models.Assignment.event_id)
+        .subquery()
+    )
+    return (
+        db.query(
+            models.Event.id,
+            models.Event.series_id,
+            models.Event.occurrence_start,
+            models.Event.type,
+            models.Event.start_time,
+            models.Event.location,
+            models.Event.required_slots,
+            func.coalesce(staffed.c.assigned, 0),
+            func.coalesce(staffed.c.approved, 0),
+        )
+        .outerjoin(staffed, staffed.c.event_id == models.Event.id)
+        .filter(
+            models.Event.church_id == church_id,
+            models.Event.start_time >= start_time,
+            models.Event.start_time < end_time,
+        )
+        .order_by(models.Event.start_time, models.Event.id)
+        .all()
+    )
+
+
+def _server_load(
+    db: Session, church_id: int, start_time: datetime, end_time: datetime
+) -> tuple[list[schemas.ServerLoad], dict[str, int]]:
+    servers = {
+        user_id: schemas.ServerLoad(user_id=user_id, name=name)
+        for user_id, name in db.query(models.User.id, models.User.name)
+        .filter(
+            models.User.church_id == church_id,
+            models.User.role == models.Role.server,
+            models.User.active.is_(True),
+        )
+        .order_by(models.User.id)
+    }
+    status_counts = {status.value: 0 for status in models.AssignmentStatus}
+    rows = (
+        db.query(
+            models.Assignment.user_id,
+            models.User.name,
+            models.Assignment.status,
+            func.count(models.Assignment.id),
+        )
+        .join(models.Event, models.Assignment.event_id == models.Event.id)
+        .join(models.User, models.Assignment.user_id == models.User.id)
+        .filter(
+            models.Event.church_id == church_id,
+            models.Event.start_time >= start_time,
+            models.Event.start_time < end_time,
+        )
+        .group_by(models.Assignment.user_id, models.User.name, models.Assignment.status)
+    )
+    for user_id, name, status, count in rows:
+        load = servers.get(user_id)
+        if load is None:
+            load = servers[user_id] = schemas.ServerLoad(user_id=user_id, name=name)
+        setattr(load, status.value, count)
+        status_counts[status.value] += count
+    ordered = sorted(
+        servers.values(),
+        key=lambda load: (-(load.proposed + load.approved + load.swapped), load.user_id),
+    )
+    return ordered, status_counts
+
+
+def _open_swaps(
+    db: Session, church_id: int, start_time: datetime, end_time: datetime
+) -> list[schemas.DashboardSwap]:
+    candidates = (
+        db.query(
+            models.SwapCandidate.swap_request_id,
+            func.count(models.SwapCandidate.user_id).label("candidates"),
+        )
+        .group_by(models.SwapCandidate.swap_request_id)
+        .subquery()
+    )
+    rows = (
+        db.query(
+            models.SwapRequest.id,
+            models.Assignment.id,
+            models.Event.id,
+            models.Assignment.user_id,
+            models.Event.start_time,
+            func.coalesce(candidates.c.candidates, 0),
+        )
+        .join(models.Assignment, models.SwapRequest.assignment_id == models.Assignment.id)
+        .join(models.Event, models.Assignment.event_id == models.Event.id)
+        .outerjoin(candidates, candidates.c.swap_request_id == models.SwapRequest.id)
+        .filter(
+            models.SwapRequest.status == models.SwapStatus.open,
+            models.Event.church_id == church_id,
+            models.Event.start_time >= start_time,
+            models.Event.start_time < end_time,
+        )
+        .order_by(models.Event.start_time, models.SwapRequest.id)
+    )
+    return [
+        schemas.DashboardSwap(
+            swap_request_id=swap_id,
+            assignment_id=assignment_id,
+            event_id=event_id,
+            user_id=user_id,
+            start_time=start,
+            candidates=count,
+        )
+        for swap_id, assignment_id, event_id, user_id, start, count in rows
+    ]
+
+
+def _absences(
+    db: Session, church_id: int, start_time: datetime, end_time: datetime
+) -> list[schemas.DashboardAbsence]:
+    rows = (
+        db.query(
+            models.Availability.user_id,
+            models.User.name,
+            models.Availability.start_time,
+            models.Availability.end_time,
+            models.Availability.note,
+        )
+        .join(models.User, models.Availability.user_id == models.User.id)
+        .filter(
+            models.User.church_id == church_id,
+            models.Availability.available.is_(False),
+            models.Availability.start_time < end_time,
+            models.Availability.end_time > start_time,
+        )
+        .order_by(models.Availability.start_time, models.Availability.id)
+    )
+    return [
+        schemas.DashboardAbsence(
+            user_id=user_id, name=name, start_time=start, end_time=end, note=note or ""
+        )
+        for user_id, name, start, end, note in rows
+    ]
+
+
+def build(
+    db: Session, church_id: int, start_time: datetime, end_time: datetime
+) -> schemas.DashboardResponse:
+    understaffed: list[schemas.DashboardEvent] = []
+    required_slots = filled_slots = events = 0
+    materialized: set[tuple[int, datetime]] = set()
+    for (
+        event_id,
+        series_id,
+        occurrence_start,
+        event_type,
+        start,
+        location,
+        slots,
+        assigned,
+        approved,
+    ) in _event_rows(db, church_id, start_time, end_time):
+        events += 1
+        required_slots += slots
+        filled_slots += min(assigned, slots)
+        if series_id is not None:
+            materialized.add((series_id, occurrence_start))
+        if assigned < slots:
+            understaffed.append(
+                schemas.DashboardEvent(
+                    event_id=event_id,
+                    series_id=series_id,
+                    occurrence_start=occurrence_start,
+                    type=event_type,
+                    start_time=start,
+                    location=location,
+                    required_slots=slots,
+                    assigned=assigned,
+                    approved=approved,
+                )
+            )
+    for series in recurrence.load_series(db, church_id, start_time, end_time):
+        for start in recurrence.occurrence_starts(series, start_time, end_time):
+            if start < start_time or (series.id, start) in materialized:
+                continue
+            events += 1
+            required_slots += series.required_slots
+            understaffed.append(
+                schemas.DashboardEvent(
+                    series_id=series.id,
+                    occurrence_start=start,
+                    type=series.type,
+                    start_time=start,
+                    location=series.location,
+                    required_slots=series.required_slots,
+                    assigned=0,
+                    approved=0,
+                )
+            )
+    understaffed.sort(key=lambda item: (item.start_time, item.event_id is None, item.event_id or 0))
+    server_load, status_counts = _server_load(db, church_id, start_time, end_time)
+    return schemas.DashboardResponse(
+        church_id=church_id,
+        start_time=start_time,
+        end_time=end_time,
+        events=events,
+        required_slots=required_slots,
+        filled_slots=filled_slots,
+        status_counts=status_counts,
+        understaffed=understaffed,
+        open_swaps=_open_swaps(db, church_id, start_time, end_time),
+        absences=_absences(db, church_id, start_time, end_time),
+        server_load=server_load,
+        conflicts=len(conflicts.find(db, church_id, start_time, end_time)),
+    )
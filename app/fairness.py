@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import argparse
+import os
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Iterable
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from . import models
+
+WINDOW_DAYS = int(os.getenv("FAIRNESS_WINDOW_DAYS", "0"))
+
+TallyKey = tuple[int, int, date]
+
+
+class TallyDeltas:
+    def __init__(self) -> None:
+        self.deltas: dict[TallyKey, list[int]] = defaultdict(lambda: [0, 0])
+
+    def add(
+        self,
+        church_id: int,
+        user_id: int,
+        start_time: datetime,
+        assigned: int = 0,
+        approved: int = 0,
+    ) -> None:
+        delta = self.deltas[(church_id, user_id, start_time.date())]
+        delta[0] += assigned
+        delta[1] += approved
+
+    def rows(self) -> list[dict]:
+        return [
+            {
+                "church_id": church_id,
+                "user_id": user_id,
+                "day": day,
+                "assigned": assigned,
+                "approved": approved,
+            }
+            for (church_id, user_id, day), (assigned, approved) in self.deltas.items()
+            if assigned or approved
+        ]
+
+
+def event_keys(db: Session, event_ids: Iterable[int]) -> dict[int, tuple[int, datetime]]:
+    event_ids = set(event_ids)
+    if not event_ids:
+        return {}
+    return {
+        event_id: (church_id, start_time)
+        for event_id, church_id, start_time in db.query(
+            models.Event.id, models.Event.church_id, models.Event.start_time
+        ).filter(models.Event.id.in_(event_ids))
+    }
+
+
+def apply(db: Session, deltas: TallyDeltas) -> None:
+    rows = deltas.rows()
+    if not rows:
+        return
+    table = models.AssignmentTally.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        statement = insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.church_id, table.c.user_id, table.c.day],
+            set_={
+                "assigned": table.c.assigned + statement.excluded.assigned,
+                "approved": table.c.approved + statement.excluded.approved,
+            },
+        )
+        db.execute(statement, rows)
+        return
+    for row in rows:
+        tally = (
+            db.query(models.AssignmentTally)
+            .filter_by(church_id=row["church_id"], user_id=row["user_id"], day=row["day"])
+            .with_for_update()
+            .first()
+        )
+        if tally:
+            tally.assigned += row["assigned"]
+            tally.approved += row["approved"]
+        else:
+            db.add(models.AssignmentTally(**row))
+    db.flush()
+
+
+def assignment_counts(
+    db: Session,
+    church_id: int,
+    window_days: int | None = None,
+) -> dict[int, int]:
+    window_days = WINDOW_DAYS if window_days is None else window_days
+    query = select(
+        models.AssignmentTally.user_id,
+        func.sum(models.AssignmentTally.assigned),
+    ).where(models.AssignmentTally.church_id == church_id)
+    if window_days:
+        since = date.today() - timedelta(days=window_days)
+        query = query.where(models.AssignmentTally.day >= since)
+    counts: dict[int, int] = defaultdict(int)
+    for user_id, assigned in db.execute(query.group_by(models.AssignmentTally.user_id)):
+        if assigned:
+            counts[user_id] = int(assigned)
+    return counts
+
+
+def rebuild(db: Session, church_id: int | None = None, commit: bool = True) -> int:
+    clear = delete(models.AssignmentTally)
+    query = db.query(
+        models.Event.church_id,
+        models.Assignment.user_id,
+        models.Event.start_time,
+        models.Assignment.status,
+    ).join(models.Event, models.Assignment.event_id == models.Event.id)
+    if church_id is not None:
+        clear = clear.where(models.AssignmentTally.church_id == church_id)
+        query = query.filter(models.Event.church_id == church_id)
+    db.execute(clear)
+    deltas = TallyDeltas()
+    for event_church_id, user_id, start_time, status in query.yield_per(1000):
+        deltas.add(
+            event_church_id,
+            user_id,
+            start_time,
+            assigned=1,
+            approved=int(status == models.AssignmentStatus.approved),
+        )
+    apply(db, deltas)
+    if commit:
+        db.commit()
+    return len(deltas.deltas)
+
+
+if __name__ == "__main__":
+    from .database import Base, SessionLocal, engine
+
+    parser = argparse.ArgumentParser(prog="python -m app.fairness")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--church-id", type=int, default=None)
+    args = parser.parse_args()
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        print(f"rebuilt {rebuild(session, args.church_id)} tallies")
+    finally:
+        session.close()
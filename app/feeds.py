@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from itertools import chain
+from typing import Any, Awaitable, Callable, Iterable, Iterator
+
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import AsyncSessionLocal
+
+FEED_CACHE_MAX_AGE_SECONDS = float(os.getenv("FEED_CACHE_MAX_AGE", "30"))
+FEED_CACHE_MAX_BYTES = int(os.getenv("FEED_CACHE_MAX_BYTES", str(2 * 1024 * 1024)))
+GZIP_MIN_BYTES = 1024
+
+
+class FeedEntry:
+    def __init__(self, body: bytes, last_modified: datetime) -> None:
+        self.body = body
+        digest = hashlib.sha1(body).hexdigest()
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gzip"'
+        self.last_modified = last_modified
+        self.rendered_at = time.monotonic()
+        self._gzipped: bytes | None = None
+
+    @property
+    def gzipped(self) -> bytes:
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, mtime=0)
+        return self._gzipped
+
+
+class FeedCache:
+    def __init__(self) -> None:
+        self._entries: dict[tuple[int, str], FeedEntry] = {}
+        self._stale: dict[tuple[int, str], FeedEntry] = {}
+        self._lock = threading.Lock()
+
+    def get(self, church_id: int, kind: str) -> FeedEntry | None:
+        with self._lock:
+            entry = self._entries.get((church_id, kind))
+            if entry and time.monotonic() - entry.rendered_at < FEED_CACHE_MAX_AGE_SECONDS:
+                return entry
+            if entry:
+                self._stale[(church_id, kind)] = self._entries.pop((church_id, kind))
+            return None
+
+    def put(self, church_id: int, kind: str, body: bytes) -> FeedEntry:
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        entry = FeedEntry(body, now)
+        with self._lock:
+            previous = self._stale.pop((church_id, kind), None)
+            if previous and previous.etag == entry.etag:
+                entry.last_modified = previous.last_modified
+            self._entries[(church_id, kind)] = entry
+        return entry
+
+    def invalidate(self, church_id: int) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == church_id]:
+                del self._entries[key]
+            for key in [key for key in self._stale if key[0] == church_id]:
+                del self._stale[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._stale.clear()
+
+
+cache = FeedCache()
+
+
+def _etag_matches(header: str, entry: FeedEntry) -> bool:
+    candidates = {item.strip().removeprefix("W/") for item in header.split(",")}
+    return "*" in candidates or entry.etag in candidates or entry.gzip_etag in candidates
+
+
+def _not_modified(request: Request, entry: FeedEntry) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, entry)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return entry.last_modified <= since
+    return False
+
+
+def _encode(chunks: Iterable[str]) -> Iterator[bytes]:
+    for chunk in chunks:
+        yield chunk.encode("utf-8")
+
+
+def _render(
+    church_id: int,
+    kind: str,
+    media_type: str,
+    render: Callable[[Any], Iterable[str]],
+    rows: Any,
+) -> FeedEntry | StreamingResponse:
+    parts: list[bytes] = []
+    size = 0
+    chunks = _encode(render(rows))
+    for chunk in chunks:
+        parts.append(chunk)
+        size += len(chunk)
+        if size > FEED_CACHE_MAX_BYTES:
+            return StreamingResponse(
+                chain(parts, chunks),
+                media_type=media_type,
+                headers={"Cache-Control": "no-cache"},
+            )
+    return cache.put(church_id, kind, b"".join(parts))
+
+
+async def serve_feed(
+    request: Request,
+    church_id: int,
+    kind: str,
+    media_type: str,
+    load: Callable[[AsyncSession], Awaitable[Any]],
+    render: Callable[[Any], Iterable[str]],
+) -> Response:
+    entry = cache.get(church_id, kind)
+    if entry is None:
+        async with AsyncSessionLocal() as db:
+            rows = await load(db)
+        rendered = await run_in_threadpool(_render, church_id, kind, media_type, render, rows)
+        if isinstance(rendered, StreamingResponse):
+            return rendered
+        entry = rendered
+
+    accepts_gzip = "gzip" in request.headers.get("accept-encoding", "").lower()
+    use_gzip = accepts_gzip and len(entry.body) >= GZIP_MIN_BYTES
+    headers = {
+        "ETag": entry.gzip_etag if use_gzip else entry.etag,
+        "Last-Modified": format_datetime(entry.last_modified, usegmt=True),
+        "Cache-Control": "public, max-age=0, must-revalidate",
+        "Vary": "Accept-Encoding",
+    }
+    if _not_modified(request, entry):
+        return Response(status_code=304, headers=headers)
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=entry.gzipped, media_type=media_type, headers=headers)
+    return Response(content=entry.body, media_type=media_type, headers=headers)
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import argparse
+from typing import Iterable
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from . import models
+
+LEVEL_POINTS = 50
+
+
+def level_for(points: int) -> int:
+    return max(1, points // LEVEL_POINTS + 1)
+
+
+class PendingPoints:
+    def __init__(self, church_id: int | None) -> None:
+        self.church_id = church_id
+        self.points = 0
+        self.awards = 0
+        self.badges: list[str] = []
+        self.last_id = 0
+
+    def add(self, entry_id: int, church_id: int | None, points: int, badge: str | None) -> None:
+        self.points += points
+        self.awards += 1
+        if badge and badge not in self.badges:
+            self.badges.append(badge)
+        if church_id is not None:
+            self.church_id = church_id
+        self.last_id = max(self.last_id, entry_id)
+
+
+def award(
+    db: Session,
+    user_id: int,
+    points: int,
+    badge: str | None = None,
+    reason: str = "",
+    church_id: int | None = None,
+) -> models.PointsLedger:
+    if church_id is None:
+        church_id = db.query(models.User.church_id).filter(models.User.id == user_id).scalar()
+    entry = models.PointsLedger(
+        user_id=user_id,
+        church_id=church_id,
+        points=points,
+        badge=badge,
+        reason=reason,
+    )
+    db.add(entry)
+    return entry
+
+
+def pending(
+    db: Session,
+    user_ids: Iterable[int] | None = None,
+    church_id: int | None = None,
+) -> dict[int, PendingPoints]:
+    ledger = models.PointsLedger
+    summary = models.Gamification
+    watermark = (
+        select(func.max(summary.ledger_id)).where(summary.user_id == ledger.user_id).scalar_subquery()
+    )
+    query = (
+        select(ledger.id, ledger.user_id, ledger.church_id, ledger.points, ledger.badge)
+        .where(ledger.id > func.coalesce(watermark, 0))
+        .order_by(ledger.id)
+    )
+    if user_ids is not None:
+        query = query.where(ledger.user_id.in_(set(user_ids)))
+    if church_id is not None:
+        query = query.where(ledger.church_id == church_id)
+    batches: dict[int, PendingPoints] = {}
+    for entry_id, user_id, entry_church_id, points, badge in db.execute(query):
+        batch = batches.setdefault(user_id, PendingPoints(entry_church_id))
+        batch.add(entry_id, entry_church_id, points, badge)
+    return batches
+
+
+def _insert_summary(db: Session, user_id: int, batch: PendingPoints) -> None:
+    values = {
+        "user_id": user_id,
+        "church_id": batch.church_id,
+        "points": batch.points,
+        "level": level_for(batch.points),
+        "badges": batch.badges,
+        "streak": batch.awards,
+        "ledger_id": batch.last_id,
+    }
+    table = models.Gamification.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        statement = (sqlite.insert if dialect == "sqlite" else postgresql.insert)(table)
+        db.execute(statement.on_conflict_do_nothing(index_elements=[table.c.user_id]), values)
+    else:
+        db.execute(insert(table), values)
+
+
+def refresh(
+    db: Session,
+    user_ids: Iterable[int] | None = None,
+    church_id: int | None = None,
+    commit: bool = True,
+) -> int:
+    db.flush()
+    batches = pending(db, user_ids, church_id)
+    if not batches:
+        return 0
+    summaries = {
+        entry.user_id: entry
+        for entry in db.query(models.Gamification).filter(
+            models.Gamification.user_id.in_(batches)
+        )
+    }
+    refreshed = 0
+    for user_id, batch in batches.items():
+        summary = summaries.get(user_id)
+        if summary is None:
+            _insert_summary(db, user_id, batch)
+            refreshed += 1
+            continue
+        badges = list(summary.badges or [])
+        badges += [badge for badge in batch.badges if badge not in badges]
+        # The watermark guard makes concurrent refreshes fold each ledger entry only once.
+        result = db.execute(
+            update(models.Gamification)
+            .where(
+                models.Gamification.id == summary.id,
+                models.Gamification.ledger_id == summary.ledger_id,
+            )
+            .values(
+                church_id=batch.church_id if batch.church_id is not None else summary.church_id,
+                points=models.Gamification.points + batch.points,
+                level=level_for(summary.points + batch.points),
+                badges=badges,
+                streak=models.Gamification.streak + batch.awards,
+                ledger_id=batch.last_id,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        refreshed += result.rowcount
+        db.expire(summary)
+    if commit:
+        db.commit()
+    return refreshed
+
+
+def leaderboard(db: Session, church_id: int, limit: int) -> list[tuple[models.Gamification, str]]:
+    return (
+        db.query(models.Gamification, models.User.name)
+        .join(models.User, models.Gamification.user_id == models.User.id)
+        .filter(models.Gamification.church_id == church_id)
+        .order_by(models.Gamification.points.desc(), models.Gamification.user_id)
+        .limit(limit)
+        .all()
+    )
+
+
+if __name__ == "__main__":
+    from .database import Base, SessionLocal, engine
+
+    parser = argparse.ArgumentParser(prog="python -m app.gamification")
+    parser.add_argument("command", choices=["refresh"])
+    parser.add_argument("--church-id", type=int, default=None)
+    args = parser.parse_args()
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        print(f"refreshed {refresh(session, church_id=args.church_id)} summaries")
+    finally:
+        session.close()
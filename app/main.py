@@ -1,14 +1,56 @@
-from datetime import datetime
-
-from fastapi import Depends, FastAPI, HTTPException, Response
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from . import models, schemas, services
-from .database import Base, SessionLocal, engine
+from . import (
+    availability,
+    backups,
+    bulk,
+    conflicts,
+    dashboard,
+    fairness,
+    feeds,
+    gamification,
+    metrics,
+    migrations,
+    models,
+    notifications,
+    pagination,
+    preferences,
+    recurrence,
+    schemas,
+    services,
+    swaps,
+)
+from .database import AsyncSessionLocal, Base, SessionLocal, async_engine, engine
 
 Base.metadata.create_all(bind=engine)
+migrations.upgrade(engine)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    stop = asyncio.Event()
+    worker = None
+    if os.getenv("NOTIFICATION_WORKER", "1") != "0":
+        worker = asyncio.create_task(notifications.run_worker(stop))
+    yield
+    stop.set()
+    if worker:
+        await worker
+    await async_engine.dispose()
 
-app = FastAPI(title="MesseCall API")
+
+app = FastAPI(title="MesseCall API", lifespan=lifespan)
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.instrument(engine, async_engine.sync_engine)
 
 
 def get_db():
@@ -19,6 +61,16 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.post("/churches", response_model=schemas.ChurchResponse)
 def create_church(payload: schemas.ChurchCreate, db: Session = Depends(get_db)):
     church = models.Church(**payload.dict())
@@ -28,9 +80,13 @@ def create_church(payload: schemas.ChurchCreate, db: Session = Depends(get_db)):
     return church
 
 
-@app.get("/churches", response_model=list[schemas.ChurchResponse])
-def list_churches(db: Session = Depends(get_db)):
-    return db.query(models.Church).all()
+@app.get("/churches", response_model=schemas.Page[schemas.ChurchResponse])
+def list_churches(
+    cursor: str | None = None,
+    limit: int = Query(default=pagination.DEFAULT_LIMIT, ge=1, le=pagination.MAX_LIMIT),
+    db: Session = Depends(get_db),
+):
+    return pagination.paginate(db.query(models.Church), [models.Church.id], cursor, limit)
 
 
 @app.post("/users", response_model=schemas.UserResponse)
@@ -42,9 +98,36 @@ def create_user(payload: schemas.UserCreate, db: Session = Depends(get_db)):
     return user
 
 
-@app.get("/users", response_model=list[schemas.UserResponse])
-def list_users(db: Session = Depends(get_db)):
-    return db.query(models.User).all()
+@app.post("/users/import", response_model=schemas.ImportResult)
+async def import_users(request: Request, format: str | None = None, all_or_nothing: bool = False):
+    return await bulk.import_rows(
+        request, "users", bulk.detect_format(request, format), all_or_nothing
+    )
+
+
+@app.get("/users/export")
+def export_users(church_id: int | None = None, format: str = "ndjson"):
+    criteria = [models.User.church_id == church_id] if church_id is not None else []
+    return bulk.export_response(models.User, schemas.UserResponse, format, "users", *criteria)
+
+
+@app.get("/users", response_model=schemas.Page[schemas.UserResponse])
+def list_users(
+    church_id: int | None = None,
+    role: models.Role | None = None,
+    active: bool | None = None,
+    cursor: str | None = None,
+    limit: int = Query(default=pagination.DEFAULT_LIMIT, ge=1, le=pagination.MAX_LIMIT),
+    db: Session = Depends(get_db),
+):
+    query = db.query(models.User)
+    if church_id is not None:
+        query = query.filter(models.User.church_id == church_id)
+    if role is not None:
+        query = query.filter(models.User.role == role)
+    if active is not None:
+        query = query.filter(models.User.active.is_(active))
+    return pagination.paginate(query, [models.User.id], cursor, limit)
 
 
 @app.post("/events", response_model=schemas.EventResponse)
@@ -53,32 +136,246 @@ def create_event(payload: schemas.EventCreate, db: Session = Depends(get_db)):
     db.add(event)
     db.commit()
     db.refresh(event)
+    feeds.cache.invalidate(event.church_id)
     return event
 
 
-@app.get("/events", response_model=list[schemas.EventResponse])
-def list_events(db: Session = Depends(get_db)):
-    return db.query(models.Event).all()
+@app.post("/events/import", response_model=schemas.ImportResult)
+async def import_events(request: Request, format: str | None = None, all_or_nothing: bool = False):
+    return await bulk.import_rows(
+        request, "events", bulk.detect_format(request, format), all_or_nothing
+    )
 
 
-@app.get("/public/churches/{church_id}/events", response_model=list[schemas.EventResponse])
-def list_public_events(church_id: int, db: Session = Depends(get_db)):
-    return (
-        db.query(models.Event)
-        .filter(models.Event.church_id == church_id, models.Event.is_public.is_(True))
-        .all()
+@app.get("/events/export")
+def export_events(
+    church_id: int | None = None,
+    start_time: datetime | None = Query(default=None, alias="from"),
+    end_time: datetime | None = Query(default=None, alias="to"),
+    format: str = "ndjson",
+):
+    criteria = []
+    if church_id is not None:
+        criteria.append(models.Event.church_id == church_id)
+    if start_time is not None:
+        criteria.append(models.Event.start_time >= start_time)
+    if end_time is not None:
+        criteria.append(models.Event.start_time < end_time)
+    return bulk.export_response(models.Event, schemas.EventResponse, format, "events", *criteria)
+
+
+@app.get("/events", response_model=schemas.Page[schemas.EventResponse])
+def list_events(
+    church_id: int | None = None,
+    start_time: datetime | None = Query(default=None, alias="from"),
+    end_time: datetime | None = Query(default=None, alias="to"),
+    cursor: str | None = None,
+    limit: int = Query(default=pagination.DEFAULT_LIMIT, ge=1, le=pagination.MAX_LIMIT),
+    db: Session = Depends(get_db),
+):
+    query = db.query(models.Event)
+    if church_id is not None:
+        query = query.filter(models.Event.church_id == church_id)
+    if start_time is not None:
+        query = query.filter(models.Event.start_time >= start_time)
+    if end_time is not None:
+        query = query.filter(models.Event.start_time < end_time)
+    return pagination.paginate(
+        query,
+        [models.Event.start_time, models.Event.id],
+        cursor,
+        limit,
+    )
+
+
+async def _public_events(
+    db: AsyncSession, church_id: int
+) -> tuple[list[models.Event], list[models.EventSeries]]:
+    events = await db.scalars(
+        select(models.Event)
+        .where(models.Event.church_id == church_id, models.Event.is_public.is_(True))
+        .order_by(models.Event.start_time, models.Event.id)
+    )
+    series = await db.scalars(
+        select(models.EventSeries)
+        .where(models.EventSeries.church_id == church_id, models.EventSeries.is_public.is_(True))
+        .order_by(models.EventSeries.id)
+    )
+    return list(events.all()), list(series.all())
+
+
+def _render_public_json(rows: tuple[list[models.Event], list[models.EventSeries]]):
+    events, series = rows
+    now = datetime.utcnow()
+    horizon = now + timedelta(days=recurrence.FEED_HORIZON_DAYS)
+    return services.iter_events_json(recurrence.merge_occurrences(events, series, now, horizon))
+
+
+@app.get("/public/churches/{church_id}/events", response_model=list[schemas.OccurrenceResponse])
+async def list_public_events(church_id: int, request: Request):
+    return await feeds.serve_feed(
+        request,
+        church_id,
+        "json",
+        "application/json",
+        lambda db: _public_events(db, church_id),
+        _render_public_json,
     )
 
 
 @app.get("/public/churches/{church_id}/events.ics")
-def list_public_events_ics(church_id: int, db: Session = Depends(get_db)):
-    events = (
+async def list_public_events_ics(church_id: int, request: Request):
+    return await feeds.serve_feed(
+        request,
+        church_id,
+        "ics",
+        "text/calendar",
+        lambda db: _public_events(db, church_id),
+        lambda rows: services.iter_public_events_ics(*rows),
+    )
+
+
+def _series_response(series: models.EventSeries) -> schemas.EventSeriesResponse:
+    return schemas.EventSeriesResponse(
+        id=series.id,
+        church_id=series.church_id,
+        type=series.type,
+        start_time=series.start_time,
+        end_time=series.end_time,
+        location=series.location,
+        required_slots=series.required_slots,
+        requires_experienced=series.requires_experienced,
+        is_public=series.is_public,
+        description=series.description,
+        frequency=series.frequency,
+        interval=series.interval,
+        by_day=series.by_day or [],
+        until=series.until,
+        count=series.count,
+        exceptions=[datetime.fromisoformat(value) for value in series.exceptions or []],
+        rrule=recurrence.rrule(series),
+    )
+
+
+def _get_series(db: Session, series_id: int) -> models.EventSeries:
+    series = db.query(models.EventSeries).filter(models.EventSeries.id == series_id).first()
+    if not series:
+        raise HTTPException(status_code=404, detail="Series not found")
+    return series
+
+
+@app.post("/series", response_model=schemas.EventSeriesResponse)
+def create_series(payload: schemas.EventSeriesCreate, db: Session = Depends(get_db)):
+    _get_church(db, payload.church_id)
+    values = payload.dict()
+    values["exceptions"] = [value.isoformat() for value in payload.exceptions]
+    series = models.EventSeries(**values)
+    try:
+        recurrence.validate(series)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    db.add(series)
+    db.commit()
+    db.refresh(series)
+    feeds.cache.invalidate(series.church_id)
+    return _series_response(series)
+
+
+@app.get("/series/{series_id}", response_model=schemas.EventSeriesResponse)
+def get_series(series_id: int, db: Session = Depends(get_db)):
+    return _series_response(_get_series(db, series_id))
+
+
+@app.get("/series/{series_id}/occurrences", response_model=list[schemas.OccurrenceResponse])
+def list_occurrences(
+    series_id: int,
+    start_time: datetime = Query(alias="from"),
+    end_time: datetime = Query(alias="to"),
+    db: Session = Depends(get_db),
+):
+    series = _get_series(db, series_id)
+    if end_time <= start_time:
+        raise HTTPException(status_code=400, detail="Invalid date range")
+    materialized = (
         db.query(models.Event)
-        .filter(models.Event.church_id == church_id, models.Event.is_public.is_(True))
+        .filter(
+            models.Event.series_id == series_id,
+            models.Event.start_time >= start_time,
+            models.Event.start_time < end_time,
+        )
         .all()
     )
-    ics = services.build_public_events_ics(events)
-    return Response(content=ics, media_type="text/calendar")
+    return recurrence.merge_occurrences(materialized, [series], start_time, end_time)
+
+
+@app.post("/series/{series_id}/exceptions", response_model=schemas.EventSeriesResponse)
+def add_series_exception(
+    series_id: int, payload: schemas.SeriesException, db: Session = Depends(get_db)
+):
+    series = _get_series(db, series_id)
+    if not recurrence.is_occurrence(series, payload.occurrence_start):
+        raise HTTPException(status_code=400, detail="Not an occurrence of this series")
+    materialized = (
+        db.query(models.Event.id)
+        .filter(
+            models.Event.series_id == series_id,
+            models.Event.occurrence_start == payload.occurrence_start,
+        )
+        .first()
+    )
+    if materialized:
+        raise HTTPException(status_code=409, detail="Occurrence already has assignments")
+    series.exceptions = [*(series.exceptions or []), payload.occurrence_start.isoformat()]
+    db.commit()
+    db.refresh(series)
+    feeds.cache.invalidate(series.church_id)
+    return _series_response(series)
+
+
+def _guard_assignment(
+    db: Session, user_id: int, event: models.Event | recurrence.Occurrence
+) -> None:
+    try:
+        conflicts.guard(db, user_id, event)
+    except conflicts.AssignmentConflict as exc:
+        raise HTTPException(status_code=409, detail=f"Assignment conflict: {exc}")
+
+
+@app.post("/series/{series_id}/assignments", response_model=schemas.AssignmentResponse)
+def create_series_assignment(
+    series_id: int,
+    payload: schemas.OccurrenceAssignmentCreate,
+    db: Session = Depends(get_db),
+):
+    series = _get_series(db, series_id)
+    if not recurrence.is_occurrence(series, payload.occurrence_start):
+        raise HTTPException(status_code=400, detail="Not an occurrence of this series")
+    _guard_assignment(
+        db, payload.user_id, recurrence.Occurrence(series, payload.occurrence_start)
+    )
+    event = recurrence.materialize(db, series, payload.occurrence_start)
+    db.flush()
+    assignment = models.Assignment(
+        event_id=event.id,
+        user_id=payload.user_id,
+        status=payload.status,
+        source=payload.source,
+    )
+    db.add(assignment)
+    deltas = fairness.TallyDeltas()
+    deltas.add(
+        event.church_id,
+        assignment.user_id,
+        event.start_time,
+        assigned=1,
+        approved=int(assignment.status == models.AssignmentStatus.approved),
+    )
+    fairness.apply(db, deltas)
+    swaps.prune_candidates(db, [assignment.user_id])
+    db.commit()
+    db.refresh(assignment)
+    feeds.cache.invalidate(event.church_id)
+    return assignment
 
 
 @app.post("/volunteer-interests", response_model=schemas.VolunteerInterestResponse)
@@ -94,16 +391,55 @@ def create_volunteer_interest(
 
 @app.post("/assignments", response_model=schemas.AssignmentResponse)
 def create_assignment(payload: schemas.AssignmentCreate, db: Session = Depends(get_db)):
+    event = db.query(models.Event).filter(models.Event.id == payload.event_id).first()
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+    _guard_assignment(db, payload.user_id, event)
     assignment = models.Assignment(**payload.dict())
     db.add(assignment)
+    deltas = fairness.TallyDeltas()
+    deltas.add(
+        event.church_id,
+        assignment.user_id,
+        event.start_time,
+        assigned=1,
+        approved=int(assignment.status == models.AssignmentStatus.approved),
+    )
+    fairness.apply(db, deltas)
+    swaps.prune_candidates(db, [assignment.user_id])
     db.commit()
     db.refresh(assignment)
     return assignment
 
 
-@app.get("/assignments", response_model=list[schemas.AssignmentResponse])
-def list_assignments(db: Session = Depends(get_db)):
-    return db.query(models.Assignment).all()
+@app.get("/assignments", response_model=schemas.Page[schemas.AssignmentResponse])
+def list_assignments(
+    church_id: int | None = None,
+    event_id: int | None = None,
+    user_id: int | None = None,
+    status: models.AssignmentStatus | None = None,
+    start_time: datetime | None = Query(default=None, alias="from"),
+    end_time: datetime | None = Query(default=None, alias="to"),
+    cursor: str | None = None,
+    limit: int = Query(default=pagination.DEFAULT_LIMIT, ge=1, le=pagination.MAX_LIMIT),
+    db: Session = Depends(get_db),
+):
+    query = db.query(models.Assignment)
+    if church_id is not None or start_time is not None or end_time is not None:
+        query = query.join(models.Event, models.Assignment.event_id == models.Event.id)
+    if church_id is not None:
+        query = query.filter(models.Event.church_id == church_id)
+    if start_time is not None:
+        query = query.filter(models.Event.start_time >= start_time)
+    if end_time is not None:
+        query = query.filter(models.Event.start_time < end_time)
+    if event_id is not None:
+        query = query.filter(models.Assignment.event_id == event_id)
+    if user_id is not None:
+        query = query.filter(models.Assignment.user_id == user_id)
+    if status is not None:
+        query = query.filter(models.Assignment.status == status)
+    return pagination.paginate(query, [models.Assignment.id], cursor, limit)
 
 
 @app.post("/preferences", response_model=schemas.PreferenceResponse)
@@ -112,16 +448,43 @@ def create_preference(payload: schemas.PreferenceCreate, db: Session = Depends(g
     db.add(preference)
     db.commit()
     db.refresh(preference)
+    preferences.store(preference)
     return preference
 
 
 @app.post("/availability", response_model=schemas.AvailabilityResponse)
 def create_availability(payload: schemas.AvailabilityCreate, db: Session = Depends(get_db)):
-    availability = models.Availability(**payload.dict())
-    db.add(availability)
+    entry = models.Availability(**payload.dict())
+    db.add(entry)
+    if not entry.available:
+        swaps.prune_candidates(db, [entry.user_id])
     db.commit()
-    db.refresh(availability)
-    return availability
+    db.refresh(entry)
+    availability.record_availability(db, entry)
+    return entry
+
+
+@app.post("/availability/import", response_model=schemas.ImportResult)
+async def import_availability(
+    request: Request, format: str | None = None, all_or_nothing: bool = False
+):
+    return await bulk.import_rows(
+        request, "availability", bulk.detect_format(request, format), all_or_nothing
+    )
+
+
+@app.get("/availability/export")
+def export_availability(church_id: int | None = None, format: str = "ndjson"):
+    criteria = []
+    if church_id is not None:
+        criteria.append(
+            models.Availability.user_id.in_(
+                select(models.User.id).where(models.User.church_id == church_id)
+            )
+        )
+    return bulk.export_response(
+        models.Availability, schemas.AvailabilityResponse, format, "availability", *criteria
+    )
 
 
 @app.post("/swap-requests", response_model=schemas.SwapRequestResponse)
@@ -133,6 +496,16 @@ def create_swap_request(payload: schemas.SwapRequestCreate, db: Session = Depend
     )
     if not assignment:
         raise HTTPException(status_code=404, detail="Assignment not found")
+    already_open = (
+        db.query(models.SwapRequest.id)
+        .filter(
+            models.SwapRequest.assignment_id == assignment.id,
+            models.SwapRequest.status == models.SwapStatus.open,
+        )
+        .first()
+    )
+    if already_open:
+        raise HTTPException(status_code=409, detail="Swap request already open")
     swap_request = services.create_swap_request(db, assignment, payload.requested_user_ids)
     return swap_request
 
@@ -150,37 +523,98 @@ def accept_swap_request(
     )
     if not swap_request:
         raise HTTPException(status_code=404, detail="Swap request not found")
-    assignment = services.accept_swap_request(db, swap_request, payload.replacement_user_id)
-    services.award_points(db, payload.replacement_user_id, points=10, badge="retter")
+    try:
+        assignment = services.accept_swap_request(
+            db, swap_request, payload.replacement_user_id, commit=False
+        )
+    except swaps.IneligibleReplacement as exc:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except swaps.SwapConflict as exc:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    services.award_points(
+        db,
+        payload.replacement_user_id,
+        points=10,
+        badge="retter",
+        commit=False,
+        reason="Ersatzdienst übernommen",
+    )
     services.create_notification(
         db,
         user_id=payload.replacement_user_id,
         title="Ersatzdienst bestätigt",
         message="Danke, dass du den Ersatzdienst übernommen hast.",
+        commit=False,
     )
+    gamification.refresh(db, [payload.replacement_user_id], commit=False)
+    db.commit()
+    db.refresh(assignment)
     return assignment
 
 
+@app.get("/users/{user_id}/open-swaps", response_model=schemas.Page[schemas.SwapRequestResponse])
+def list_open_swaps(
+    user_id: int,
+    cursor: str | None = None,
+    limit: int = Query(default=pagination.DEFAULT_LIMIT, ge=1, le=pagination.MAX_LIMIT),
+    db: Session = Depends(get_db),
+):
+    return pagination.paginate(
+        swaps.open_swaps_query(db, user_id), [models.SwapRequest.id], cursor, limit
+    )
+
+
 @app.post("/backup-pool", response_model=schemas.BackupPoolResponse)
 def create_backup_pool(payload: schemas.BackupPoolCreate, db: Session = Depends(get_db)):
     pool = models.BackupPool(**payload.dict())
     db.add(pool)
     db.commit()
     db.refresh(pool)
+    backups.record_backup(db, pool)
     return pool
 
 
 @app.get("/backup-pool/suggestions")
-def backup_suggestions(start_time: str, end_time: str, db: Session = Depends(get_db)):
+def backup_suggestions(
+    start_time: str,
+    end_time: str,
+    church_id: int | None = None,
+    location: str | None = None,
+    db: Session = Depends(get_db),
+):
     start_dt = datetime.fromisoformat(start_time)
     end_dt = datetime.fromisoformat(end_time)
-    candidates = services.suggest_backup_candidates(db, start_dt, end_dt)
-    return {"candidates": candidates}
+    candidates = services.suggest_backup_candidates(db, start_dt, end_dt, church_id, location)
+    return {"candidates": [candidate.user_id for candidate in candidates]}
+
+
+@app.get("/events/{event_id}/backups", response_model=schemas.PlanSuggestion)
+def event_backups(
+    event_id: int,
+    limit: int = Query(default=10, ge=1, le=pagination.MAX_LIMIT),
+    db: Session = Depends(get_db),
+):
+    event = db.query(models.Event).filter(models.Event.id == event_id).first()
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+    return _plan_suggestion(event, services.suggest_event_backups(db, event, limit))
 
 
 @app.post("/gamification", response_model=schemas.GamificationResponse)
 def create_gamification(payload: schemas.GamificationCreate, db: Session = Depends(get_db)):
-    entry = models.Gamification(**payload.dict())
+    exists = (
+        db.query(models.Gamification.id)
+        .filter(models.Gamification.user_id == payload.user_id)
+        .first()
+    )
+    if exists:
+        raise HTTPException(status_code=409, detail="Gamification already exists")
+    church_id = (
+        db.query(models.User.church_id).filter(models.User.id == payload.user_id).scalar()
+    )
+    entry = models.Gamification(**payload.dict(), church_id=church_id)
     db.add(entry)
     db.commit()
     db.refresh(entry)
@@ -188,16 +622,34 @@ def create_gamification(payload: schemas.GamificationCreate, db: Session = Depen
 
 
 @app.get("/gamification/{user_id}", response_model=schemas.GamificationResponse)
-def get_gamification(user_id: int, db: Session = Depends(get_db)):
-    entry = db.query(models.Gamification).filter(models.Gamification.user_id == user_id).first()
+async def get_gamification(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    entry = await db.scalar(
+        select(models.Gamification).where(models.Gamification.user_id == user_id).limit(1)
+    )
     if not entry:
         raise HTTPException(status_code=404, detail="Gamification not found")
     return entry
 
 
-@app.get("/notifications/{user_id}", response_model=list[schemas.NotificationResponse])
-def list_notifications(user_id: int, db: Session = Depends(get_db)):
-    return db.query(models.Notification).filter(models.Notification.user_id == user_id).all()
+@app.get("/notifications/{user_id}", response_model=schemas.Page[schemas.NotificationResponse])
+async def list_notifications(
+    user_id: int,
+    status: models.NotificationStatus | None = None,
+    cursor: str | None = None,
+    limit: int = Query(default=pagination.DEFAULT_LIMIT, ge=1, le=pagination.MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_db),
+):
+    statement = select(models.Notification).where(models.Notification.user_id == user_id)
+    if status is not None:
+        statement = statement.where(models.Notification.status == status)
+    return await pagination.paginate_async(
+        db,
+        statement,
+        [models.Notification.id],
+        cursor,
+        limit,
+        descending=True,
+    )
 
 
 @app.post("/events/{event_id}/suggestions", response_model=schemas.PlanSuggestion)
@@ -224,9 +676,174 @@ def propose_plan(event_id: int, db: Session = Depends(get_db)):
     event = db.query(models.Event).filter(models.Event.id == event_id).first()
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
-    suggestions = services.suggest_assignments(db, event)
-    assignments = services.create_assignments_from_suggestion(db, event, suggestions)
-    return assignments
+    suggestions = services.propose_open_slots(db, event)
+    if not suggestions:
+        return []
+    return services.create_assignments_from_suggestion(db, event, suggestions)
+
+
+def _plan_suggestion(
+    event: models.Event | recurrence.Occurrence, candidates: list[services.ScoredCandidate]
+) -> schemas.PlanSuggestion:
+    return schemas.PlanSuggestion(
+        event_id=event.id,
+        series_id=event.series_id,
+        occurrence_start=event.occurrence_start,
+        items=[
+            schemas.PlanSuggestionItem(user_id=item.user_id, score=item.score, reason=item.reason)
+            for item in candidates
+        ],
+    )
+
+
+def _get_church(db: Session, church_id: int) -> models.Church:
+    church = db.query(models.Church).filter(models.Church.id == church_id).first()
+    if not church:
+        raise HTTPException(status_code=404, detail="Church not found")
+    return church
+
+
+@app.post("/churches/{church_id}/plans", response_model=list[schemas.AssignmentResponse])
+def plan_church(
+    church_id: int,
+    start_time: datetime = Query(alias="from"),
+    end_time: datetime = Query(alias="to"),
+    max_per_server: int | None = Query(default=None, ge=1),
+    db: Session = Depends(get_db),
+):
+    _get_church(db, church_id)
+    if end_time <= start_time:
+        raise HTTPException(status_code=400, detail="Invalid date range")
+    return services.plan_church_events(db, church_id, start_time, end_time, max_per_server)
+
+
+@app.get("/churches/{church_id}/calendar", response_model=list[schemas.OccurrenceResponse])
+def church_calendar(
+    church_id: int,
+    start_time: datetime = Query(alias="from"),
+    end_time: datetime = Query(alias="to"),
+    db: Session = Depends(get_db),
+):
+    _get_church(db, church_id)
+    if end_time <= start_time:
+        raise HTTPException(status_code=400, detail="Invalid date range")
+    return recurrence.expand(db, church_id, start_time, end_time)
+
+
+@app.get("/churches/{church_id}/dashboard", response_model=schemas.DashboardResponse)
+def church_dashboard(
+    church_id: int,
+    start_time: datetime = Query(alias="from"),
+    end_time: datetime = Query(alias="to"),
+    db: Session = Depends(get_db),
+):
+    _get_church(db, church_id)
+    if end_time <= start_time:
+        raise HTTPException(status_code=400, detail="Invalid date range")
+    return dashboard.build(db, church_id, start_time, end_time)
+
+
+@app.get("/churches/{church_id}/conflicts", response_model=list[schemas.ConflictResponse])
+def church_conflicts(
+    church_id: int,
+    start_time: datetime | None = Query(default=None, alias="from"),
+    end_time: datetime | None = Query(default=None, alias="to"),
+    db: Session = Depends(get_db),
+):
+    _get_church(db, church_id)
+    if start_time is not None and end_time is not None and end_time <= start_time:
+        raise HTTPException(status_code=400, detail="Invalid date range")
+    return [
+        schemas.ConflictResponse(**vars(conflict), detail=conflict.describe())
+        for conflict in conflicts.find(db, church_id, start_time, end_time)
+    ]
+
+
+@app.post("/churches/{church_id}/plans/repair", response_model=list[schemas.PlanChangeResponse])
+def repair_church_plan(
+    church_id: int,
+    start_time: datetime | None = Query(default=None, alias="from"),
+    end_time: datetime | None = Query(default=None, alias="to"),
+    user_id: list[int] | None = Query(default=None),
+    dry_run: bool = False,
+    db: Session = Depends(get_db),
+):
+    _get_church(db, church_id)
+    start_time = start_time or datetime.utcnow()
+    if end_time is not None and end_time <= start_time:
+        raise HTTPException(status_code=400, detail="Invalid date range")
+    changes = services.repair_plan(
+        db, church_id, start_time, end_time, user_id, commit=not dry_run
+    )
+    if dry_run:
+        db.rollback()
+    return changes
+
+
+@app.get("/churches/{church_id}/leaderboard", response_model=list[schemas.LeaderboardEntry])
+def church_leaderboard(
+    church_id: int,
+    limit: int = Query(default=10, ge=1, le=pagination.MAX_LIMIT),
+    db: Session = Depends(get_db),
+):
+    _get_church(db, church_id)
+    return [
+        schemas.LeaderboardEntry(
+            rank=rank,
+            user_id=entry.user_id,
+            name=name,
+            points=entry.points,
+            level=entry.level,
+            badges=entry.badges or [],
+        )
+        for rank, (entry, name) in enumerate(
+            gamification.leaderboard(db, church_id, limit), start=1
+        )
+    ]
+
+
+@app.post("/churches/{church_id}/fairness/rebuild")
+def rebuild_fairness(church_id: int, db: Session = Depends(get_db)):
+    _get_church(db, church_id)
+    return {"church_id": church_id, "tallies": fairness.rebuild(db, church_id)}
+
+
+@app.post("/churches/{church_id}/plans/suggestions", response_model=list[schemas.PlanSuggestion])
+def suggest_church_plan(
+    church_id: int,
+    start_time: datetime = Query(alias="from"),
+    end_time: datetime = Query(alias="to"),
+    max_per_server: int | None = Query(default=None, ge=1),
+    db: Session = Depends(get_db),
+):
+    _get_church(db, church_id)
+    if end_time <= start_time:
+        raise HTTPException(status_code=400, detail="Invalid date range")
+    return [
+        _plan_suggestion(event, candidates)
+        for event, candidates in services.suggest_church_plan(
+            db, church_id, start_time, end_time, max_per_server
+        )
+    ]
+
+
+@app.get("/churches/{church_id}/backups", response_model=list[schemas.PlanSuggestion])
+def understaffed_backups(
+    church_id: int,
+    start_time: datetime = Query(alias="from"),
+    end_time: datetime = Query(alias="to"),
+    limit: int = Query(default=10, ge=1, le=pagination.MAX_LIMIT),
+    db: Session = Depends(get_db),
+):
+    _get_church(db, church_id)
+    if end_time <= start_time:
+        raise HTTPException(status_code=400, detail="Invalid date range")
+    return [
+        _plan_suggestion(event, candidates)
+        for event, candidates in services.suggest_understaffed_backups(
+            db, church_id, start_time, end_time, limit
+        )
+    ]
 
 
 @app.post("/assignments/{assignment_id}/approve")
@@ -238,14 +855,32 @@ def approve_assignment(assignment_id: int, db: Session = Depends(get_db)):
     )
     if not assignment:
         raise HTTPException(status_code=404, detail="Assignment not found")
-    assignment.status = models.AssignmentStatus.approved
-    assignment.approved_at = datetime.utcnow()
-    db.commit()
-    services.award_points(db, assignment.user_id, points=5, badge="zuverlaessig")
-    services.create_notification(
-        db,
-        user_id=assignment.user_id,
-        title="Einsatz bestätigt",
-        message="Dein Einsatz wurde bestätigt. Vielen Dank!",
-    )
+    services.approve_assignments(db, [assignment])
     return {"assignment_id": assignment.id, "status": assignment.status}
+
+
+@app.post("/assignments/approve", response_model=list[schemas.AssignmentResponse])
+def approve_assignments(payload: schemas.AssignmentApproval, db: Session = Depends(get_db)):
+    assignment_ids = set(payload.assignment_ids)
+    assignments = (
+        db.query(models.Assignment).filter(models.Assignment.id.in_(assignment_ids)).all()
+    )
+    if len(assignments) != len(assignment_ids):
+        raise HTTPException(status_code=404, detail="Assignment not found")
+    return services.approve_assignments(db, assignments)
+
+
+@app.post("/events/{event_id}/approve", response_model=list[schemas.AssignmentResponse])
+def approve_event(event_id: int, db: Session = Depends(get_db)):
+    event = db.query(models.Event).filter(models.Event.id == event_id).first()
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+    assignments = (
+        db.query(models.Assignment)
+        .filter(
+            models.Assignment.event_id == event_id,
+            models.Assignment.status == models.AssignmentStatus.proposed,
+        )
+        .all()
+    )
+    return services.approve_assignments(db, assignments)
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import math
+from typing import Sequence, TypeVar
+
+FORBIDDEN = 1e9
+UNFILLED = 1e6
+
+EventT = TypeVar("EventT")
+
+
+def overlap_clusters(events: Sequence[EventT]) -> list[list[EventT]]:
+    clusters: list[list[EventT]] = []
+    cluster_end = None
+    for event in sorted(events, key=lambda item: item.start_time):
+        if clusters and cluster_end is not None and event.start_time < cluster_end:
+            clusters[-1].append(event)
+            cluster_end = max(cluster_end, event.end_time)
+        else:
+            clusters.append([event])
+            cluster_end = event.end_time
+    return clusters
+
+
+def solve_assignment(cost: list[list[float]]) -> list[int]:
+    rows = len(cost)
+    if not rows:
+        return []
+    columns = len(cost[0])
+    if columns < rows:
+        raise ValueError("cost matrix needs at least as many columns as rows")
+    u = [0.0] * (rows + 1)
+    v = [0.0] * (columns + 1)
+    match = [0] * (columns + 1)
+    way = [0] * (columns + 1)
+    for row in range(1, rows + 1):
+        match[0] = row
+        column0 = 0
+        minv = [math.inf] * (columns + 1)
+        used = [False] * (columns + 1)
+        while True:
+            used[column0] = True
+            row0 = match[column0]
+            delta = math.inf
+            column1 = 0
+            cost_row = cost[row0 - 1]
+            u_row0 = u[row0]
+            for column in range(1, columns + 1):
+                if used[column]:
+                    continue
+                current = cost_row[column - 1] - u_row0 - v[column]
+                if current < minv[column]:
+                    minv[column] = current
+                    way[column] = column0
+                if minv[column] < delta:
+                    delta = minv[column]
+                    column1 = column
+            for column in range(columns + 1):
+                if used[column]:
+                    u[match[column]] += delta
+                    v[column] -= delta
+                else:
+                    minv[column] -= delta
+            column0 = column1
+            if match[column0] == 0:
+                break
+        while column0:
+            column1 = way[column0]
+            match[column0] = match[column1]
+            column0 = column1
+    result = [0] * rows
+    for column in range(1, columns + 1):
+        if match[column]:
+            result[match[column] - 1] = column - 1
+    return result
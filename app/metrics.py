@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Iterable
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+DEBUG_HEADERS = os.getenv("METRICS_DEBUG_HEADERS", "0") != "0"
+SLOW_QUERY_SECONDS = float(os.getenv("SLOW_QUERY_MS", "0")) / 1000
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+UNMATCHED_ROUTE = "unmatched"
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds", "route")
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.route = UNMATCHED_ROUTE
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.requests: dict[tuple[str, str, str], int] = {}
+        self.latency: dict[tuple[str, str], Histogram] = {}
+        self.request_queries: dict[tuple[str, str], Histogram] = {}
+        self.request_db_seconds: dict[tuple[str, str], float] = {}
+        self.query_latency = Histogram(QUERY_BUCKETS)
+        self.slow_queries = 0
+
+    def record_request(
+        self, method: str, route: str, status: int, seconds: float, stats: RequestStats
+    ) -> None:
+        key = (method, route)
+        with self._lock:
+            status_key = (method, route, str(status))
+            self.requests[status_key] = self.requests.get(status_key, 0) + 1
+            histogram = self.latency.get(key)
+            if histogram is None:
+                histogram = self.latency[key] = Histogram(LATENCY_BUCKETS)
+                self.request_queries[key] = Histogram(QUERY_COUNT_BUCKETS)
+                self.request_db_seconds[key] = 0.0
+            histogram.observe(seconds)
+            self.request_queries[key].observe(stats.queries)
+            self.request_db_seconds[key] += stats.db_seconds
+
+    def record_query(self, seconds: float, slow: bool) -> None:
+        with self._lock:
+            self.query_latency.observe(seconds)
+            if slow:
+                self.slow_queries += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests.clear()
+            self.latency.clear()
+            self.request_queries.clear()
+            self.request_db_seconds.clear()
+            self.query_latency = Histogram(QUERY_BUCKETS)
+            self.slow_queries = 0
+
+
+registry = Registry()
+_current: ContextVar[RequestStats | None] = ContextVar("messecall_request_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info["query_started"].pop()
+    elapsed = time.perf_counter() - started
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+    slow = SLOW_QUERY_SECONDS > 0 and elapsed >= SLOW_QUERY_SECONDS
+    registry.record_query(elapsed, slow)
+    if slow:
+        logger.warning(
+            "Slow query (%.1f ms, route %s): %s",
+            elapsed * 1000,
+            stats.route if stats is not None else "-",
+            " ".join(statement.split())[:500],
+        )
+
+
+def _handle_error(context) -> None:
+    started = context.connection.info.get("query_started") if context.connection else None
+    if started:
+        started.pop()
+
+
+def instrument(*engines: Engine) -> None:
+    if not ENABLED:
+        return
+    for engine in engines:
+        if event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+            continue
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+class MetricsMiddleware:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not ENABLED:
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = _current.set(stats)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                route = scope.get("route")
+                if route is not None:
+                    stats.route = route.path
+                if DEBUG_HEADERS:
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (b"x-db-query-count", str(stats.queries).encode()),
+                        (b"x-db-time-ms", f"{stats.db_seconds * 1000:.2f}".encode()),
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            if route is not None:
+                stats.route = route.path
+            registry.record_request(
+                scope["method"], stats.route, status, time.perf_counter() - started, stats
+            )
+            _current.reset(token)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _histogram_lines(
+    name: str, label_names: tuple[str, ...], label_values: tuple[str, ...], histogram: Histogram
+) -> list[str]:
+    lines: list[str] = []
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        bucket = _labels(label_names, label_values, f'le="{bound:g}"')
+        lines.append(f"{name}_bucket{bucket} {cumulative}")
+    bucket = _labels(label_names, label_values, 'le="+Inf"')
+    lines.append(f"{name}_bucket{bucket} {histogram.count}")
+    lines.append(f"{name}_sum{_labels(label_names, label_values)} {histogram.total:.6f}")
+    lines.append(f"{name}_count{_labels(label_names, label_values)} {histogram.count}")
+    return lines
+
+
+def render() -> str:
+    route_labels = ("method", "route")
+    with registry._lock:
+        lines = [
+            "# HELP messecall_http_requests_total HTTP requests by route and status.",
+            "# TYPE messecall_http_requests_total counter",
+        ]
+        for (method, route, status), count in sorted(registry.requests.items()):
+            lines.append(
+                f"messecall_http_requests_total"
+                f"{_labels(('method', 'route', 'status'), (method, route, status))} {count}"
+            )
+        lines += [
+            "# HELP messecall_http_request_duration_seconds Request latency by route.",
+            "# TYPE messecall_http_request_duration_seconds histogram",
+        ]
+        for key, histogram in sorted(registry.latency.items()):
+            lines += _histogram_lines(
+                "messecall_http_request_duration_seconds", route_labels, key, histogram
+            )
+        lines += [
+            "# HELP messecall_http_request_db_queries SQL statements issued per request.",
+            "# TYPE messecall_http_request_db_queries histogram",
+        ]
+        for key, histogram in sorted(registry.request_queries.items()):
+            lines += _histogram_lines(
+                "messecall_http_request_db_queries", route_labels, key, histogram
+            )
+        lines += [
+            "# HELP messecall_http_request_db_seconds_total Time spent in SQL per route.",
+            "# TYPE messecall_http_request_db_seconds_total counter",
+        ]
+        for key, seconds in sorted(registry.request_db_seconds.items()):
+            lines.append(
+                f"messecall_http_request_db_seconds_total{_labels(route_labels, key)} {seconds:.6f}"
+            )
+        lines += [
+            "# HELP messecall_db_query_duration_seconds SQL statement latency.",
+            "# TYPE messecall_db_query_duration_seconds histogram",
+        ]
+        lines += _histogram_lines("messecall_db_query_duration_seconds", (), (), registry.query_latency)
+        lines += [
+            "# HELP messecall_db_slow_queries_total SQL statements slower than SLOW_QUERY_MS.",
+            "# TYPE messecall_db_slow_queries_total counter",
+            f"messecall_db_slow_queries_total {registry.slow_queries}",
+        ]
+    return "\n".join(lines) + "\n"
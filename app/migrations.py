@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, insert, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from . import fairness, gamification, swaps
+from .database import engine as default_engine
+from .models import Assignment, Base, Event, SwapCandidate, SwapRequest, SwapStatus
+
+migration_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("revision", String, primary_key=True),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def _create_indexes(*index_names: str) -> Callable[[Connection], None]:
+    def step(connection: Connection) -> None:
+        existing_tables = set(inspect(connection).get_table_names())
+        indexes = {
+            index.name: index
+            for table in Base.metadata.tables.values()
+            for index in table.indexes
+        }
+        for index_name in index_names:
+            index = indexes[index_name]
+            if index.table.name in existing_tables:
+                index.create(connection, checkfirst=True)
+
+    return step
+
+
+def _add_columns(table_name: str, defaults: dict[str, str]) -> Callable[[Connection], None]:
+    def step(connection: Connection) -> None:
+        inspector = inspect(connection)
+        if table_name not in inspector.get_table_names():
+            return
+        existing = {column["name"] for column in inspector.get_columns(table_name)}
+        table = Base.metadata.tables[table_name]
+        for column_name, default in defaults.items():
+            if column_name in existing:
+                continue
+            column_type = table.c[column_name].type.compile(dialect=connection.dialect)
+            clause = f" DEFAULT {default}" if default else ""
+            connection.execute(
+                text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}{clause}")
+            )
+
+    return step
+
+
+def _add_enum_value(enum_name: str, value: str) -> Callable[[Connection], None]:
+    def step(connection: Connection) -> None:
+        if connection.dialect.name == "postgresql":
+            connection.execute(text(f"ALTER TYPE {enum_name} ADD VALUE IF NOT EXISTS '{value}'"))
+
+    return step
+
+
+def _rebuild_assignment_tallies(connection: Connection) -> None:
+    session = Session(bind=connection)
+    try:
+        fairness.rebuild(session, commit=False)
+        session.flush()
+    finally:
+        session.close()
+
+
+def _backfill_swap_candidates(connection: Connection) -> None:
+    session = Session(bind=connection)
+    try:
+        open_swaps = session.execute(
+            select(
+                SwapRequest.id,
+                SwapRequest.requested_user_ids,
+                Assignment.user_id,
+                Event.church_id,
+                Event.start_time,
+                Event.end_time,
+                Event.requires_experienced,
+            )
+            .join(Assignment, SwapRequest.assignment_id == Assignment.id)
+            .join(Event, Assignment.event_id == Event.id)
+            .where(SwapRequest.status == SwapStatus.open)
+        ).all()
+        rows = [
+            {"swap_request_id": swap_id, "user_id": user_id}
+            for swap_id, requested, owner_id, church_id, start, end, experienced in open_swaps
+            for user_id in swaps.eligible_users(
+                session, church_id, start, end, experienced, owner_id, requested or ()
+            )
+        ]
+        if rows:
+            session.execute(insert(SwapCandidate), rows)
+        session.flush()
+    finally:
+        session.close()
+
+
+def _merge_gamification(connection: Connection) -> None:
+    table = Base.metadata.tables["gamification"]
+    users = Base.metadata.tables["users"]
+    merged: dict[int, dict] = {}
+    duplicates: list[int] = []
+    for row in connection.execute(
+        select(table.c.id, table.c.user_id, table.c.points, table.c.badges, table.c.streak)
+        .order_by(table.c.id)
+    ):
+        current = merged.get(row.user_id)
+        if current is None:
+            merged[row.user_id] = {
+                "id": row.id,
+                "points": row.points or 0,
+                "badges": list(row.badges or []),
+                "streak": row.streak or 0,
+                "merged": False,
+            }
+            continue
+        current["points"] += row.points or 0
+        current["badges"] += [badge for badge in row.badges or [] if badge not in current["badges"]]
+        current["streak"] += row.streak or 0
+        current["merged"] = True
+        duplicates.append(row.id)
+    for values in merged.values():
+        if values["merged"]:
+            connection.execute(
+                table.update()
+                .where(table.c.id == values["id"])
+                .values(
+                    points=values["points"],
+                    level=gamification.level_for(values["points"]),
+                    badges=values["badges"],
+                    streak=values["streak"],
+                )
+            )
+    if duplicates:
+        connection.execute(table.delete().where(table.c.id.in_(duplicates)))
+    connection.execute(
+        table.update()
+        .where(table.c.church_id.is_(None))
+        .values(
+            church_id=select(users.c.church_id)
+            .where(users.c.id == table.c.user_id)
+            .scalar_subquery()
+        )
+    )
+
+
+def _steps(*steps: Callable[[Connection], None]) -> Callable[[Connection], None]:
+    def step(connection: Connection) -> None:
+        for item in steps:
+            item(connection)
+
+    return step
+
+
+REVISIONS: list[tuple[str, Callable[[Connection], None]]] = [
+    (
+        "0001_lookup_indexes",
+        _create_indexes(
+            "ix_users_church_id",
+            "ix_events_church_start",
+            "ix_assignments_event_id",
+            "ix_assignments_user_id",
+            "ix_preferences_user_id",
+            "ix_availabilities_user_window",
+            "ix_availabilities_window",
+            "ix_volunteer_interests_event_id",
+            "ix_volunteer_interests_user_id",
+            "ix_backup_pool_user_window",
+            "ix_backup_pool_window",
+        ),
+    ),
+    ("0002_notification_user_index", _create_indexes("ix_notifications_user_id")),
+    (
+        "0003_notification_outbox",
+        _steps(
+            _add_enum_value("notificationstatus", "failed"),
+            _add_columns(
+                "notifications",
+                {
+                    "channel": "'in_app'",
+                    "attempts": "0",
+                    "next_attempt_at": "",
+                    "claim_token": "",
+                    "claimed_until": "",
+                    "last_error": "''",
+                    "sent_at": "",
+                },
+            ),
+            _create_indexes("ix_notifications_outbox"),
+        ),
+    ),
+    ("0004_assignment_tallies", _rebuild_assignment_tallies),
+    (
+        "0005_swap_marketplace",
+        _steps(
+            _add_columns("swap_requests", {"version": "1"}),
+            _create_indexes("ix_swap_requests_status", "ix_swap_candidates_user_id"),
+            _backfill_swap_candidates,
+        ),
+    ),
+    (
+        "0006_points_ledger",
+        _steps(
+            _add_columns("gamification", {"church_id": "", "ledger_id": "0"}),
+            _merge_gamification,
+            _create_indexes(
+                "ux_gamification_user_id",
+                "ix_gamification_church_points",
+                "ix_points_ledger_user_entry",
+            ),
+        ),
+    ),
+    (
+        "0007_event_series",
+        _steps(
+            _add_columns("events", {"series_id": "", "occurrence_start": ""}),
+            _create_indexes("ux_events_series_occurrence", "ix_event_series_church_id"),
+        ),
+    ),
+    ("0008_points_ledger_church_index", _create_indexes("ix_points_ledger_church_entry")),
+]
+
+
+def upgrade(engine: Engine) -> list[str]:
+    applied_now: list[str] = []
+    with engine.begin() as connection:
+        migration_metadata.create_all(connection)
+        applied = set(connection.scalars(select(schema_migrations.c.revision)))
+        for revision, step in REVISIONS:
+            if revision in applied:
+                continue
+            step(connection)
+            connection.execute(
+                schema_migrations.insert().values(revision=revision, applied_at=datetime.utcnow())
+            )
+            applied_now.append(revision)
+    return applied_now
+
+
+if __name__ == "__main__":
+    Base.metadata.create_all(bind=default_engine)
+    for revision in upgrade(default_engine):
+        print(f"applied {revision}")
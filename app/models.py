@@ -1,14 +1,27 @@
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import date, datetime
 from enum import Enum
 
-from sqlalchemy import Boolean, DateTime, Enum as SqlEnum, ForeignKey, Integer, String
-from sqlalchemy.dialects.sqlite import JSON
+from sqlalchemy import (
+    JSON,
+    Boolean,
+    Date,
+    DateTime,
+    Enum as SqlEnum,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    UniqueConstraint,
+)
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .database import Base
 
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
 
 class Role(str, Enum):
     admin = "admin"
@@ -31,6 +44,7 @@ class SwapStatus(str, Enum):
 class NotificationStatus(str, Enum):
     pending = "pending"
     sent = "sent"
+    failed = "failed"
 
 
 class Church(Base):
@@ -54,7 +68,7 @@ class User(Base):
     name: Mapped[str] = mapped_column(String, nullable=False)
     email: Mapped[str] = mapped_column(String, nullable=False, unique=True)
     role: Mapped[Role] = mapped_column(SqlEnum(Role), nullable=False)
-    church_id: Mapped[int] = mapped_column(ForeignKey("churches.id"), nullable=False)
+    church_id: Mapped[int] = mapped_column(ForeignKey("churches.id"), nullable=False, index=True)
     experience_level: Mapped[int] = mapped_column(Integer, default=1)
     active: Mapped[bool] = mapped_column(Boolean, default=True)
 
@@ -64,8 +78,37 @@ class User(Base):
     notifications = relationship("Notification", back_populates="user")
 
 
+class EventSeries(Base):
+    __tablename__ = "event_series"
+    __table_args__ = (Index("ix_event_series_church_id", "church_id"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    church_id: Mapped[int] = mapped_column(ForeignKey("churches.id"), nullable=False)
+    type: Mapped[str] = mapped_column(String, nullable=False)
+    start_time: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    end_time: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    location: Mapped[str] = mapped_column(String, nullable=False)
+    required_slots: Mapped[int] = mapped_column(Integer, default=1)
+    requires_experienced: Mapped[bool] = mapped_column(Boolean, default=False)
+    is_public: Mapped[bool] = mapped_column(Boolean, default=False)
+    description: Mapped[str] = mapped_column(String, default="")
+    frequency: Mapped[str] = mapped_column(String, nullable=False, default="weekly")
+    interval: Mapped[int] = mapped_column(Integer, default=1)
+    by_day: Mapped[list[str]] = mapped_column(JSONType, default=list)
+    until: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    count: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    exceptions: Mapped[list[str]] = mapped_column(JSONType, default=list)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    occurrences = relationship("Event", back_populates="series")
+
+
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (
+        Index("ix_events_church_start", "church_id", "start_time"),
+        Index("ux_events_series_occurrence", "series_id", "occurrence_start", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     church_id: Mapped[int] = mapped_column(ForeignKey("churches.id"), nullable=False)
@@ -77,8 +120,11 @@ class Event(Base):
     requires_experienced: Mapped[bool] = mapped_column(Boolean, default=False)
     is_public: Mapped[bool] = mapped_column(Boolean, default=False)
     description: Mapped[str] = mapped_column(String, default="")
+    series_id: Mapped[int | None] = mapped_column(ForeignKey("event_series.id"), nullable=True)
+    occurrence_start: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
 
     church = relationship("Church", back_populates="events")
+    series = relationship("EventSeries", back_populates="occurrences")
     assignments = relationship("Assignment", back_populates="event")
     volunteers = relationship("VolunteerInterest", back_populates="event")
 
@@ -87,8 +133,8 @@ class Assignment(Base):
     __tablename__ = "assignments"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
-    event_id: Mapped[int] = mapped_column(ForeignKey("events.id"), nullable=False)
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    event_id: Mapped[int] = mapped_column(ForeignKey("events.id"), nullable=False, index=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
     status: Mapped[AssignmentStatus] = mapped_column(
         SqlEnum(AssignmentStatus),
         default=AssignmentStatus.proposed,
@@ -102,22 +148,41 @@ class Assignment(Base):
     swap_request = relationship("SwapRequest", back_populates="assignment", uselist=False)
 
 
+class AssignmentTally(Base):
+    __tablename__ = "assignment_tallies"
+    __table_args__ = (
+        UniqueConstraint("church_id", "user_id", "day", name="uq_assignment_tallies_key"),
+        Index("ix_assignment_tallies_church_day", "church_id", "day"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    church_id: Mapped[int] = mapped_column(ForeignKey("churches.id"), nullable=False)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    day: Mapped[date] = mapped_column(Date, nullable=False)
+    assigned: Mapped[int] = mapped_column(Integer, default=0)
+    approved: Mapped[int] = mapped_column(Integer, default=0)
+
+
 class Preference(Base):
     __tablename__ = "preferences"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
-    preferred_weekdays: Mapped[list[str]] = mapped_column(JSON, default=list)
-    preferred_time_ranges: Mapped[list[str]] = mapped_column(JSON, default=list)
-    preferred_locations: Mapped[list[str]] = mapped_column(JSON, default=list)
-    partner_user_ids: Mapped[list[int]] = mapped_column(JSON, default=list)
-    favorite_event_types: Mapped[list[str]] = mapped_column(JSON, default=list)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
+    preferred_weekdays: Mapped[list[str]] = mapped_column(JSONType, default=list)
+    preferred_time_ranges: Mapped[list[str]] = mapped_column(JSONType, default=list)
+    preferred_locations: Mapped[list[str]] = mapped_column(JSONType, default=list)
+    partner_user_ids: Mapped[list[int]] = mapped_column(JSONType, default=list)
+    favorite_event_types: Mapped[list[str]] = mapped_column(JSONType, default=list)
 
     user = relationship("User", back_populates="preferences")
 
 
 class Availability(Base):
     __tablename__ = "availabilities"
+    __table_args__ = (
+        Index("ix_availabilities_user_window", "user_id", "start_time", "end_time"),
+        Index("ix_availabilities_window", "start_time", "end_time"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
@@ -131,8 +196,8 @@ class VolunteerInterest(Base):
     __tablename__ = "volunteer_interests"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
-    event_id: Mapped[int] = mapped_column(ForeignKey("events.id"), nullable=False)
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    event_id: Mapped[int] = mapped_column(ForeignKey("events.id"), nullable=False, index=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
     note: Mapped[str] = mapped_column(String, default="")
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
@@ -141,50 +206,97 @@ class VolunteerInterest(Base):
 
 class SwapRequest(Base):
     __tablename__ = "swap_requests"
+    __table_args__ = (Index("ix_swap_requests_status", "status"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     assignment_id: Mapped[int] = mapped_column(ForeignKey("assignments.id"), nullable=False)
     status: Mapped[SwapStatus] = mapped_column(SqlEnum(SwapStatus), default=SwapStatus.open)
-    requested_user_ids: Mapped[list[int]] = mapped_column(JSON, default=list)
+    requested_user_ids: Mapped[list[int]] = mapped_column(JSONType, default=list)
     replacement_user_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    version: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     assignment = relationship("Assignment", back_populates="swap_request")
+    candidates = relationship("SwapCandidate", cascade="all, delete-orphan")
+
+
+class SwapCandidate(Base):
+    __tablename__ = "swap_candidates"
+    __table_args__ = (Index("ix_swap_candidates_user_id", "user_id"),)
+
+    swap_request_id: Mapped[int] = mapped_column(
+        ForeignKey("swap_requests.id"), primary_key=True
+    )
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
 
 
 class BackupPool(Base):
     __tablename__ = "backup_pool"
+    __table_args__ = (
+        Index("ix_backup_pool_user_window", "user_id", "start_time", "end_time"),
+        Index("ix_backup_pool_window", "start_time", "end_time"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
     start_time: Mapped[datetime] = mapped_column(DateTime, nullable=False)
     end_time: Mapped[datetime] = mapped_column(DateTime, nullable=False)
-    preferred_locations: Mapped[list[str]] = mapped_column(JSON, default=list)
+    preferred_locations: Mapped[list[str]] = mapped_column(JSONType, default=list)
     active: Mapped[bool] = mapped_column(Boolean, default=True)
 
 
 class Gamification(Base):
     __tablename__ = "gamification"
+    __table_args__ = (
+        Index("ux_gamification_user_id", "user_id", unique=True),
+        Index("ix_gamification_church_points", "church_id", "points"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    church_id: Mapped[int | None] = mapped_column(ForeignKey("churches.id"), nullable=True)
     points: Mapped[int] = mapped_column(Integer, default=0)
     level: Mapped[int] = mapped_column(Integer, default=1)
-    badges: Mapped[list[str]] = mapped_column(JSON, default=list)
+    badges: Mapped[list[str]] = mapped_column(JSONType, default=list)
     streak: Mapped[int] = mapped_column(Integer, default=0)
+    ledger_id: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+
+class PointsLedger(Base):
+    __tablename__ = "points_ledger"
+    __table_args__ = (
+        Index("ix_points_ledger_user_entry", "user_id", "id"),
+        Index("ix_points_ledger_church_entry", "church_id", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    church_id: Mapped[int | None] = mapped_column(ForeignKey("churches.id"), nullable=True)
+    points: Mapped[int] = mapped_column(Integer, nullable=False)
+    badge: Mapped[str | None] = mapped_column(String, nullable=True)
+    reason: Mapped[str] = mapped_column(String, default="")
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
 
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (Index("ix_notifications_outbox", "status", "next_attempt_at"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
     title: Mapped[str] = mapped_column(String, nullable=False)
     message: Mapped[str] = mapped_column(String, nullable=False)
     status: Mapped[NotificationStatus] = mapped_column(
         SqlEnum(NotificationStatus),
         default=NotificationStatus.pending,
     )
+    channel: Mapped[str] = mapped_column(String, default="in_app")
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    next_attempt_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    claim_token: Mapped[str | None] = mapped_column(String, nullable=True)
+    claimed_until: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    last_error: Mapped[str] = mapped_column(String, default="")
+    sent_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="notifications")
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import random
+import smtplib
+import urllib.request
+import uuid
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from typing import Protocol
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = int(os.getenv("NOTIFICATION_BATCH_SIZE", "100"))
+SEND_TIMEOUT_SECONDS = float(os.getenv("NOTIFICATION_SEND_TIMEOUT", "10"))
+LEASE_SECONDS = max(
+    int(os.getenv("NOTIFICATION_LEASE_SECONDS", "60")), int(SEND_TIMEOUT_SECONDS * 2)
+)
+MAX_ATTEMPTS = int(os.getenv("NOTIFICATION_MAX_ATTEMPTS", "6"))
+BACKOFF_BASE_SECONDS = float(os.getenv("NOTIFICATION_BACKOFF_BASE", "30"))
+BACKOFF_MAX_SECONDS = float(os.getenv("NOTIFICATION_BACKOFF_MAX", "3600"))
+POLL_INTERVAL_SECONDS = float(os.getenv("NOTIFICATION_POLL_INTERVAL", "2"))
+
+
+class Channel(Protocol):
+    def send(self, notification: models.Notification, user: models.User) -> None: ...
+
+
+class InAppChannel:
+    def send(self, notification: models.Notification, user: models.User) -> None:
+        return None
+
+
+class SmtpChannel:
+    def __init__(self) -> None:
+        self.host = os.getenv("SMTP_HOST", "localhost")
+        self.port = int(os.getenv("SMTP_PORT", "1025"))
+        self.sender = os.getenv("SMTP_SENDER", "messecall@localhost")
+
+    def send(self, notification: models.Notification, user: models.User) -> None:
+        message = EmailMessage()
+        message["From"] = self.sender
+        message["To"] = user.email
+        message["Subject"] = notification.title
+        message.set_content(notification.message)
+        with smtplib.SMTP(self.host, self.port, timeout=SEND_TIMEOUT_SECONDS) as client:
+            client.send_message(message)
+
+
+class WebhookChannel:
+    def __init__(self) -> None:
+        self.url = os.getenv("NOTIFICATION_WEBHOOK_URL", "")
+
+    def send(self, notification: models.Notification, user: models.User) -> None:
+        if not self.url:
+            raise RuntimeError("NOTIFICATION_WEBHOOK_URL is not configured")
+        body = json.dumps(
+            {
+                "notification_id": notification.id,
+                "user_id": user.id,
+                "title": notification.title,
+                "message": notification.message,
+            }
+        ).encode("utf-8")
+        request = urllib.request.Request(
+            self.url,
+            data=body,
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=SEND_TIMEOUT_SECONDS) as response:
+            response.read()
+
+
+channels: dict[str, Channel] = {
+    "in_app": InAppChannel(),
+    "email": SmtpChannel(),
+    "webhook": WebhookChannel(),
+}
+
+
+def register_channel(name: str, channel: Channel) -> None:
+    channels[name] = channel
+
+
+def backoff_delay(attempts: int) -> timedelta:
+    delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (attempts - 1))
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def claim_batch(db: Session, limit: int = BATCH_SIZE) -> list[models.Notification]:
+    now = datetime.utcnow()
+    claimable = (
+        models.Notification.status == models.NotificationStatus.pending,
+        or_(
+            models.Notification.next_attempt_at.is_(None),
+            models.Notification.next_attempt_at <= now,
+        ),
+        or_(
+            models.Notification.claimed_until.is_(None),
+            models.Notification.claimed_until < now,
+        ),
+    )
+    ids = list(
+        db.scalars(
+            select(models.Notification.id)
+            .where(*claimable)
+            .order_by(models.Notification.id)
+            .limit(limit)
+        )
+    )
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    db.execute(
+        update(models.Notification)
+        .where(models.Notification.id.in_(ids), *claimable)
+        .values(claim_token=token, claimed_until=now + timedelta(seconds=LEASE_SECONDS))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return (
+        db.query(models.Notification)
+        .filter(models.Notification.claim_token == token)
+        .order_by(models.Notification.id)
+        .all()
+    )
+
+
+def _settle(db: Session, notification_id: int, token: str | None, **values) -> bool:
+    result = db.execute(
+        update(models.Notification)
+        .where(models.Notification.id == notification_id, models.Notification.claim_token == token)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def deliver(db: Session, notifications: list[models.Notification]) -> int:
+    if not notifications:
+        return 0
+    user_ids = {notification.user_id for notification in notifications}
+    users = {
+        user.id: user
+        for user in db.query(models.User).filter(models.User.id.in_(user_ids)).all()
+    }
+    tokens = {notification.id: notification.claim_token for notification in notifications}
+    # Each message commits on its own; detach the batch so those commits do not expire it.
+    for instance in [*notifications, *users.values()]:
+        db.expunge(instance)
+    sent = 0
+    for notification in notifications:
+        token = tokens[notification.id]
+        # Renew the lease per message; a row whose lease was taken over belongs to another worker.
+        if not _settle(
+            db,
+            notification.id,
+            token,
+            claimed_until=datetime.utcnow() + timedelta(seconds=LEASE_SECONDS),
+        ):
+            continue
+        attempts = (notification.attempts or 0) + 1
+        released = {"claim_token": None, "claimed_until": None, "attempts": attempts}
+        try:
+            channel = channels.get(notification.channel)
+            if channel is None:
+                raise LookupError(f"Unknown channel {notification.channel!r}")
+            channel.send(notification, users[notification.user_id])
+        except Exception as exc:
+            logger.warning("Delivery of notification %s failed: %s", notification.id, exc)
+            released["last_error"] = str(exc)[:500]
+            if attempts >= MAX_ATTEMPTS:
+                released["status"] = models.NotificationStatus.failed
+            else:
+                released["next_attempt_at"] = datetime.utcnow() + backoff_delay(attempts)
+            _settle(db, notification.id, token, **released)
+            continue
+        if _settle(
+            db,
+            notification.id,
+            token,
+            status=models.NotificationStatus.sent,
+            sent_at=datetime.utcnow(),
+            last_error="",
+            **released,
+        ):
+            sent += 1
+    db.expire_all()
+    return sent
+
+
+def process_batch(limit: int = BATCH_SIZE) -> int:
+    db = SessionLocal()
+    try:
+        notifications = claim_batch(db, limit)
+        deliver(db, notifications)
+        return len(notifications)
+    finally:
+        db.close()
+
+
+async def run_worker(stop: asyncio.Event, interval: float = POLL_INTERVAL_SECONDS) -> None:
+    while not stop.is_set():
+        try:
+            processed = await run_in_threadpool(process_batch)
+        except Exception:
+            logger.exception("Notification worker batch failed")
+            processed = 0
+        if processed:
+            continue
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_worker(asyncio.Event()))
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+from typing import Any
+
+from fastapi import HTTPException
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Query
+from sqlalchemy.sql.elements import ColumnElement
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+def encode_cursor(values: list[Any]) -> str:
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: list[ColumnElement]) -> list[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, list) or len(payload) != len(columns):
+            raise ValueError(cursor)
+        return [
+            datetime.fromisoformat(value) if column.type.python_type is datetime else value
+            for value, column in zip(payload, columns)
+        ]
+    except (ValueError, TypeError) as exc:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from exc
+
+
+def _apply_keyset(statement, columns: list[ColumnElement], cursor: str | None, descending: bool):
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        key = tuple_(*columns)
+        statement = statement.filter(
+            key < tuple_(*values) if descending else key > tuple_(*values)
+        )
+    ordering = [column.desc() if descending else column.asc() for column in columns]
+    return statement.order_by(*ordering)
+
+
+def _page(rows: list[Any], columns: list[ColumnElement], limit: int) -> dict[str, Any]:
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, column.key) for column in columns])
+    return {"items": rows, "next_cursor": next_cursor}
+
+
+def paginate(
+    query: Query,
+    columns: list[ColumnElement],
+    cursor: str | None,
+    limit: int,
+    descending: bool = False,
+) -> dict[str, Any]:
+    rows = _apply_keyset(query, columns, cursor, descending).limit(limit + 1).all()
+    return _page(rows, columns, limit)
+
+
+async def paginate_async(
+    db: AsyncSession,
+    statement: Select,
+    columns: list[ColumnElement],
+    cursor: str | None,
+    limit: int,
+    descending: bool = False,
+) -> dict[str, Any]:
+    statement = _apply_keyset(statement, columns, cursor, descending).limit(limit + 1)
+    rows = list((await db.scalars(statement)).all())
+    return _page(rows, columns, limit)
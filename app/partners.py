@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import threading
+
+from .preferences import PreferenceProfile
+
+
+class PartnerGraph:
+    def __init__(self, profiles: dict[int, PreferenceProfile]) -> None:
+        parent: dict[int, int] = {}
+
+        def find(user_id: int) -> int:
+            root = parent.setdefault(user_id, user_id)
+            while root != parent[root]:
+                parent[root] = parent[parent[root]]
+                root = parent[root]
+            return root
+
+        for user_id, profile in profiles.items():
+            for partner_id in profile.partner_user_ids:
+                partner = profiles.get(partner_id)
+                if partner_id == user_id or not partner or user_id not in partner.partner_user_ids:
+                    continue
+                left, right = find(user_id), find(partner_id)
+                if left != right:
+                    parent[max(left, right)] = min(left, right)
+
+        members: dict[int, list[int]] = {}
+        for user_id in parent:
+            members.setdefault(find(user_id), []).append(user_id)
+        self.groups: list[frozenset[int]] = [
+            frozenset(group) for _, group in sorted(members.items()) if len(group) > 1
+        ]
+        self.group_of: dict[int, int] = {
+            user_id: index for index, group in enumerate(self.groups) for user_id in group
+        }
+
+
+_graphs: dict[int, tuple[frozenset, PartnerGraph]] = {}
+_lock = threading.Lock()
+
+
+def get_graph(church_id: int, profiles: dict[int, PreferenceProfile]) -> PartnerGraph:
+    signature = frozenset(
+        (user_id, profile.preference_id) for user_id, profile in profiles.items()
+    )
+    with _lock:
+        cached = _graphs.get(church_id)
+    if cached and cached[0] == signature:
+        return cached[1]
+    graph = PartnerGraph(profiles)
+    with _lock:
+        _graphs[church_id] = (signature, graph)
+    return graph
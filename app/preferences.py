@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import re
+import sys
+import threading
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import models
+
+WEEKDAYS = {
+    0: ("montag", "mo", "monday", "mon"),
+    1: ("dienstag", "di", "tuesday", "tue"),
+    2: ("mittwoch", "mi", "wednesday", "wed"),
+    3: ("donnerstag", "do", "thursday", "thu"),
+    4: ("freitag", "fr", "friday", "fri"),
+    5: ("samstag", "sonnabend", "sa", "saturday", "sat"),
+    6: ("sonntag", "so", "sunday", "sun"),
+}
+WEEKDAY_NAMES = {name: day for day, names in WEEKDAYS.items() for name in names}
+
+NAMED_TIME_RANGES = {
+    "morgens": (6 * 60, 10 * 60),
+    "vormittags": (8 * 60, 12 * 60),
+    "mittags": (11 * 60, 14 * 60),
+    "nachmittags": (12 * 60, 18 * 60),
+    "abends": (17 * 60, 22 * 60),
+}
+
+TIME_RANGE = re.compile(
+    r"^\s*(\d{1,2})(?::(\d{2}))?\s*(?:-|–|bis)\s*(\d{1,2})(?::(\d{2}))?\s*(?:uhr)?\s*$"
+)
+
+
+def parse_weekdays(values: Iterable[str]) -> int:
+    mask = 0
+    for value in values:
+        key = str(value).strip().lower().rstrip(".")
+        day = WEEKDAY_NAMES.get(key)
+        if day is None and key.isdigit() and int(key) < 7:
+            day = int(key)
+        if day is not None:
+            mask |= 1 << day
+    return mask
+
+
+def parse_time_ranges(values: Iterable[str]) -> tuple[tuple[int, int], ...]:
+    ranges: list[tuple[int, int]] = []
+    for value in values:
+        key = str(value).strip().lower()
+        if key in NAMED_TIME_RANGES:
+            ranges.append(NAMED_TIME_RANGES[key])
+            continue
+        match = TIME_RANGE.match(key)
+        if not match:
+            continue
+        start_hour, start_minute, end_hour, end_minute = match.groups()
+        start = int(start_hour) * 60 + int(start_minute or 0)
+        end = int(end_hour) * 60 + int(end_minute or 0)
+        if 0 <= start < end <= 24 * 60:
+            ranges.append((start, end))
+    return tuple(sorted(ranges))
+
+
+def minute_span(start_time: datetime, end_time: datetime) -> tuple[int, int]:
+    start = start_time.hour * 60 + start_time.minute
+    end = end_time.hour * 60 + end_time.minute
+    if end_time.date() > start_time.date():
+        end = 24 * 60
+    return start, end
+
+
+class PreferenceProfile:
+    def __init__(self, preference: models.Preference) -> None:
+        self.preference_id = preference.id
+        self.preferred_locations = frozenset(
+            sys.intern(location) for location in preference.preferred_locations or ()
+        )
+        self.favorite_event_types = frozenset(
+            sys.intern(event_type) for event_type in preference.favorite_event_types or ()
+        )
+        self.partner_user_ids = frozenset(preference.partner_user_ids or ())
+        self.weekday_mask = parse_weekdays(preference.preferred_weekdays or ())
+        self.time_ranges = parse_time_ranges(preference.preferred_time_ranges or ())
+
+    def matches_weekday(self, start_time: datetime) -> bool:
+        return bool(self.weekday_mask >> start_time.weekday() & 1)
+
+    def matches_time(self, start_time: datetime, end_time: datetime) -> bool:
+        start, end = minute_span(start_time, end_time)
+        return any(low <= start and end <= high for low, high in self.time_ranges)
+
+
+_profiles: dict[int, PreferenceProfile] = {}
+_lock = threading.Lock()
+
+
+def store(preference: models.Preference) -> PreferenceProfile:
+    profile = PreferenceProfile(preference)
+    with _lock:
+        _profiles[preference.id] = profile
+    return profile
+
+
+def invalidate() -> None:
+    with _lock:
+        _profiles.clear()
+
+
+def load_profiles(db: Session, user_ids: list[int]) -> dict[int, PreferenceProfile]:
+    if not user_ids:
+        return {}
+    latest = dict(
+        db.query(models.Preference.user_id, func.max(models.Preference.id))
+        .filter(models.Preference.user_id.in_(user_ids))
+        .group_by(models.Preference.user_id)
+        .all()
+    )
+    with _lock:
+        profiles = {
+            user_id: _profiles[preference_id]
+            for user_id, preference_id in latest.items()
+            if preference_id in _profiles
+        }
+    missing = [preference_id for user_id, preference_id in latest.items() if user_id not in profiles]
+    if missing:
+        for preference in (
+            db.query(models.Preference).filter(models.Preference.id.in_(missing)).all()
+        ):
+            profiles[preference.user_id] = store(preference)
+    return profiles
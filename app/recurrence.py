@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import calendar
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models
+
+WEEKDAY_CODES = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+FREQUENCIES = ("weekly", "monthly")
+BY_DAY = re.compile(r"^([+-]?[1-5])?(MO|TU|WE|TH|FR|SA|SU)$")
+ICS_TIME = "%Y%m%dT%H%M%SZ"
+FEED_HORIZON_DAYS = int(os.getenv("SERIES_FEED_HORIZON_DAYS", "180"))
+
+
+def parse_by_day(values: Iterable[str]) -> list[tuple[int | None, int]]:
+    parsed: list[tuple[int | None, int]] = []
+    for value in values:
+        match = BY_DAY.match(value.strip().upper())
+        if not match:
+            raise ValueError(f"Invalid BYDAY value: {value}")
+        position, code = match.groups()
+        parsed.append((int(position) if position else None, WEEKDAY_CODES.index(code)))
+    return parsed
+
+
+def validate(series: models.EventSeries) -> None:
+    if series.frequency not in FREQUENCIES:
+        raise ValueError("Unsupported frequency")
+    if (series.interval or 1) < 1:
+        raise ValueError("Interval must be positive")
+    if series.end_time <= series.start_time:
+        raise ValueError("end_time must be after start_time")
+    if series.until is not None and series.count is not None:
+        raise ValueError("Use either until or count")
+    by_day = parse_by_day(series.by_day or ())
+    if series.frequency == "weekly" and any(position for position, _ in by_day):
+        raise ValueError("Weekly rules take plain weekdays")
+    if series.frequency == "monthly" and any(position is None for position, _ in by_day):
+        raise ValueError("Monthly rules need an ordinal weekday such as 1SU or -1SU")
+
+
+def _weekly(series: models.EventSeries, after: datetime | None) -> Iterator[datetime]:
+    start = series.start_time
+    interval = series.interval or 1
+    weekdays = sorted({day for _, day in parse_by_day(series.by_day or ())} or {start.weekday()})
+    week = (start - timedelta(days=start.weekday())).replace(
+        hour=start.hour, minute=start.minute, second=start.second, microsecond=0
+    )
+    if after is not None and after > start:
+        # Without COUNT the expansion can jump straight to the requested window.
+        skipped = (after - week).days // (7 * interval)
+        week += timedelta(weeks=max(0, skipped - 1) * interval)
+    while True:
+        for weekday in weekdays:
+            occurrence = week + timedelta(days=weekday)
+            if occurrence >= start:
+                yield occurrence
+        week += timedelta(weeks=interval)
+
+
+def _nth_weekday(year: int, month: int, position: int, weekday: int) -> int | None:
+    days = [
+        day
+        for day in range(1, calendar.monthrange(year, month)[1] + 1)
+        if calendar.weekday(year, month, day) == weekday
+    ]
+    index = position - 1 if position > 0 else position
+    if -len(days) <= index < len(days):
+        return days[index]
+    return None
+
+
+def _monthly(series: models.EventSeries, after: datetime | None) -> Iterator[datetime]:
+    start = series.start_time
+    interval = series.interval or 1
+    rules = parse_by_day(series.by_day or ()) or [((start.day - 1) // 7 + 1, start.weekday())]
+    months = start.year * 12 + start.month - 1
+    if after is not None and after > start:
+        skipped = (after.year * 12 + after.month - 1 - months) // interval
+        months += max(0, skipped - 1) * interval
+    while True:
+        year, month = divmod(months, 12)
+        days = sorted(
+            day
+            for day in (_nth_weekday(year, month + 1, position, weekday) for position, weekday in rules)
+            if day is not None
+        )
+        for day in days:
+            occurrence = start.replace(year=year, month=month + 1, day=day)
+            if occurrence >= start:
+                yield occurrence
+        months += interval
+
+
+def occurrence_starts(
+    series: models.EventSeries,
+    window_start: datetime,
+    window_end: datetime,
+) -> Iterator[datetime]:
+    duration = series.end_time - series.start_time
+    exceptions = {datetime.fromisoformat(value) for value in series.exceptions or ()}
+    expand = _weekly if series.frequency == "weekly" else _monthly
+    produced = 0
+    for occurrence in expand(series, None if series.count else window_start - duration):
+        if series.until is not None and occurrence > series.until:
+            return
+        if series.count is not None and produced >= series.count:
+            return
+        produced += 1
+        if occurrence >= window_end:
+            return
+        if occurrence + duration <= window_start or occurrence in exceptions:
+            continue
+        yield occurrence
+
+
+class Occurrence:
+    def __init__(self, series: models.EventSeries, start_time: datetime) -> None:
+        self.id: int | None = None
+        self.series = series
+        self.series_id = series.id
+        self.occurrence_start = start_time
+        self.church_id = series.church_id
+        self.type = series.type
+        self.start_time = start_time
+        self.end_time = start_time + (series.end_time - series.start_time)
+        self.location = series.location
+        self.required_slots = series.required_slots
+        self.requires_experienced = series.requires_experienced
+        self.is_public = series.is_public
+        self.description = series.description
+
+
+def load_series(
+    db: Session,
+    church_id: int,
+    window_start: datetime,
+    window_end: datetime,
+    public_only: bool = False,
+) -> list[models.EventSeries]:
+    query = db.query(models.EventSeries).filter(
+        models.EventSeries.church_id == church_id,
+        models.EventSeries.start_time < window_end,
+        (models.EventSeries.until.is_(None)) | (models.EventSeries.until >= window_start),
+    )
+    if public_only:
+        query = query.filter(models.EventSeries.is_public.is_(True))
+    return query.order_by(models.EventSeries.id).all()
+
+
+def merge_occurrences(
+    events: list[models.Event],
+    series: Iterable[models.EventSeries],
+    window_start: datetime,
+    window_end: datetime,
+) -> list[models.Event | Occurrence]:
+    materialized = {
+        (event.series_id, event.occurrence_start) for event in events if event.series_id is not None
+    }
+    merged: list[models.Event | Occurrence] = list(events)
+    for item in series:
+        for start in occurrence_starts(item, window_start, window_end):
+            if (item.id, start) not in materialized:
+                merged.append(Occurrence(item, start))
+    merged.sort(key=lambda event: (event.start_time, event.id is None, event.id or 0))
+    return merged
+
+
+def expand(
+    db: Session,
+    church_id: int,
+    window_start: datetime,
+    window_end: datetime,
+    public_only: bool = False,
+) -> list[models.Event | Occurrence]:
+    query = db.query(models.Event).filter(
+        models.Event.church_id == church_id,
+        models.Event.start_time >= window_start,
+        models.Event.start_time < window_end,
+    )
+    if public_only:
+        query = query.filter(models.Event.is_public.is_(True))
+    series = load_series(db, church_id, window_start, window_end, public_only)
+    return merge_occurrences(query.all(), series, window_start, window_end)
+
+
+def is_occurrence(series: models.EventSeries, start_time: datetime) -> bool:
+    duration = series.end_time - series.start_time
+    return start_time in set(
+        occurrence_starts(series, start_time, start_time + duration + timedelta(seconds=1))
+    )
+
+
+def materialize(db: Session, series: models.EventSeries, start_time: datetime) -> models.Event:
+    existing = (
+        db.query(models.Event)
+        .filter(models.Event.series_id == series.id, models.Event.occurrence_start == start_time)
+        .first()
+    )
+    if existing:
+        return existing
+    occurrence = Occurrence(series, start_time)
+    event = models.Event(
+        church_id=occurrence.church_id,
+        type=occurrence.type,
+        start_time=occurrence.start_time,
+        end_time=occurrence.end_time,
+        location=occurrence.location,
+        required_slots=occurrence.required_slots,
+        requires_experienced=occurrence.requires_experienced,
+        is_public=occurrence.is_public,
+        description=occurrence.description,
+        series_id=series.id,
+        occurrence_start=start_time,
+    )
+    try:
+        with db.begin_nested():
+            db.add(event)
+    except IntegrityError:
+        # Another request materialized the same occurrence first.
+        return (
+            db.query(models.Event)
+            .filter(models.Event.series_id == series.id, models.Event.occurrence_start == start_time)
+            .one()
+        )
+    return event
+
+
+def rrule(series: models.EventSeries) -> str:
+    parts = [f"FREQ={series.frequency.upper()}"]
+    if (series.interval or 1) > 1:
+        parts.append(f"INTERVAL={series.interval}")
+    if series.by_day:
+        parts.append("BYDAY=" + ",".join(value.strip().upper() for value in series.by_day))
+    if series.until is not None:
+        parts.append(f"UNTIL={series.until.strftime(ICS_TIME)}")
+    if series.count is not None:
+        parts.append(f"COUNT={series.count}")
+    return ";".join(parts)
@@ -1,8 +1,15 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, Generic, List, Optional, TypeVar
 
 from pydantic import BaseModel, EmailStr, Field
 
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+
 
 class ChurchBase(BaseModel):
     name: str
@@ -61,11 +68,54 @@ class EventCreate(EventBase):
 
 class EventResponse(EventBase):
     id: int
+    series_id: Optional[int] = None
+    occurrence_start: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class EventSeriesBase(EventBase):
+    frequency: str = "weekly"
+    interval: int = 1
+    by_day: List[str] = Field(default_factory=list)
+    until: Optional[datetime] = None
+    count: Optional[int] = None
+    exceptions: List[datetime] = Field(default_factory=list)
+
+
+class EventSeriesCreate(EventSeriesBase):
+    pass
+
+
+class EventSeriesResponse(EventSeriesBase):
+    id: int
+    rrule: str
 
     class Config:
         from_attributes = True
 
 
+class SeriesException(BaseModel):
+    occurrence_start: datetime
+
+
+class OccurrenceResponse(EventBase):
+    id: Optional[int] = None
+    series_id: Optional[int] = None
+    occurrence_start: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class OccurrenceAssignmentCreate(BaseModel):
+    occurrence_start: datetime
+    user_id: int
+    status: str = "proposed"
+    source: str = "manual"
+
+
 class AssignmentBase(BaseModel):
     event_id: int
     user_id: int
@@ -86,6 +136,10 @@ class AssignmentResponse(AssignmentBase):
         from_attributes = True
 
 
+class AssignmentApproval(BaseModel):
+    assignment_ids: List[int]
+
+
 class PreferenceBase(BaseModel):
     user_id: int
     preferred_weekdays: List[str] = Field(default_factory=list)
@@ -156,6 +210,7 @@ class SwapRequestCreate(SwapRequestBase):
 class SwapRequestResponse(SwapRequestBase):
     id: int
     replacement_user_id: Optional[int] = None
+    version: int = 1
     created_at: datetime
 
     class Config:
@@ -199,6 +254,98 @@ class GamificationCreate(GamificationBase):
 
 class GamificationResponse(GamificationBase):
     id: int
+    church_id: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    user_id: int
+    name: str
+    points: int
+    level: int
+    badges: List[str] = Field(default_factory=list)
+
+
+class DashboardEvent(BaseModel):
+    event_id: Optional[int] = None
+    series_id: Optional[int] = None
+    occurrence_start: Optional[datetime] = None
+    type: str
+    start_time: datetime
+    location: str
+    required_slots: int
+    assigned: int
+    approved: int
+
+
+class DashboardSwap(BaseModel):
+    swap_request_id: int
+    assignment_id: int
+    event_id: int
+    user_id: int
+    start_time: datetime
+    candidates: int
+
+
+class DashboardAbsence(BaseModel):
+    user_id: int
+    name: str
+    start_time: datetime
+    end_time: datetime
+    note: str = ""
+
+
+class ServerLoad(BaseModel):
+    user_id: int
+    name: str
+    proposed: int = 0
+    approved: int = 0
+    swapped: int = 0
+
+
+class DashboardResponse(BaseModel):
+    church_id: int
+    start_time: datetime
+    end_time: datetime
+    events: int
+    required_slots: int
+    filled_slots: int
+    status_counts: Dict[str, int]
+    understaffed: List[DashboardEvent]
+    open_swaps: List[DashboardSwap]
+    absences: List[DashboardAbsence]
+    server_load: List[ServerLoad]
+    conflicts: int = 0
+
+
+class ConflictResponse(BaseModel):
+    kind: str
+    user_id: int
+    event_id: Optional[int] = None
+    assignment_id: Optional[int] = None
+    start_time: datetime
+    end_time: datetime
+    other_assignment_id: Optional[int] = None
+    other_event_id: Optional[int] = None
+    blocked_from: Optional[datetime] = None
+    blocked_until: Optional[datetime] = None
+    detail: str
+
+    class Config:
+        from_attributes = True
+
+
+class PlanChangeResponse(BaseModel):
+    assignment_id: int
+    event_id: int
+    previous_user_id: int
+    user_id: Optional[int] = None
+    score: Optional[float] = None
+    reason: str = ""
+    conflict: str
 
     class Config:
         from_attributes = True
@@ -210,7 +357,9 @@ class NotificationResponse(BaseModel):
     title: str
     message: str
     status: str
+    channel: str
     created_at: datetime
+    sent_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -223,5 +372,18 @@ class PlanSuggestionItem(BaseModel):
 
 
 class PlanSuggestion(BaseModel):
-    event_id: int
+    event_id: Optional[int] = None
+    series_id: Optional[int] = None
+    occurrence_start: Optional[datetime] = None
     items: List[PlanSuggestionItem]
+
+
+class ImportRowError(BaseModel):
+    line: int
+    errors: List[str]
+
+
+class ImportResult(BaseModel):
+    inserted: int
+    failed: int
+    errors: List[ImportRowError] = Field(default_factory=list)
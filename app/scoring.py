@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Sequence
+
+import numpy as np
+
+from . import models
+from .preferences import minute_span
+
+if TYPE_CHECKING:
+    from .preferences import PreferenceProfile
+
+LOCATION_BONUS = 1.0
+EVENT_TYPE_BONUS = 0.5
+PARTNER_BONUS = 0.25
+WEEKDAY_BONUS = 0.25
+TIME_OF_DAY_BONUS = 0.25
+VOLUNTEER_BONUS = 1.5
+PARTNER_GROUP_TOLERANCE = 1.0
+EXPERIENCE_BONUS = 0.25
+
+
+def _intern(vocabulary: dict[str, int], value: str) -> int:
+    return vocabulary.setdefault(value, len(vocabulary))
+
+
+class ScoringKernel:
+    def __init__(
+        self,
+        users: Sequence[models.User],
+        preferences: dict[int, PreferenceProfile],
+        assignment_counts: dict[int, int],
+        partner_groups: dict[int, int] | None = None,
+    ) -> None:
+        self.user_ids: list[int] = [user.id for user in users]
+        self.columns = {user_id: column for column, user_id in enumerate(self.user_ids)}
+        size = len(self.user_ids)
+        self.groups = np.full(size, -1, dtype=np.int64)
+        for user_id, group in (partner_groups or {}).items():
+            if user_id in self.columns:
+                self.groups[self.columns[user_id]] = group
+        self.counts = np.array(
+            [assignment_counts.get(user_id, 0) for user_id in self.user_ids],
+            dtype=np.float64,
+        )
+        self.inexperienced = np.array([user.experience_level < 2 for user in users], dtype=bool)
+
+        self.locations: dict[str, int] = {}
+        self.event_types: dict[str, int] = {}
+        location_pairs: list[tuple[int, int]] = []
+        type_pairs: list[tuple[int, int]] = []
+        partner_pairs: list[tuple[int, int]] = []
+        self.weekday_masks = np.zeros(size, dtype=np.int64)
+        range_count = max(
+            (len(profile.time_ranges) for profile in preferences.values()), default=0
+        )
+        self.range_starts = np.full((size, range_count), 24 * 60 + 1, dtype=np.int32)
+        self.range_ends = np.full((size, range_count), -1, dtype=np.int32)
+        for column, user_id in enumerate(self.user_ids):
+            preference = preferences.get(user_id)
+            if not preference:
+                continue
+            self.weekday_masks[column] = preference.weekday_mask
+            for index, (low, high) in enumerate(preference.time_ranges):
+                self.range_starts[column, index] = low
+                self.range_ends[column, index] = high
+            for location in preference.preferred_locations:
+                location_pairs.append((column, _intern(self.locations, location)))
+            for event_type in preference.favorite_event_types:
+                type_pairs.append((column, _intern(self.event_types, event_type)))
+            for partner_id in preference.partner_user_ids:
+                if partner_id in self.columns:
+                    partner_pairs.append((column, self.columns[partner_id]))
+
+        self.preferred_locations = np.zeros((size, len(self.locations)), dtype=bool)
+        self.favorite_types = np.zeros((size, len(self.event_types)), dtype=bool)
+        self.partners = np.zeros((size, size), dtype=np.float32)
+        for target, pairs in (
+            (self.preferred_locations, location_pairs),
+            (self.favorite_types, type_pairs),
+            (self.partners, partner_pairs),
+        ):
+            if pairs:
+                rows, columns = zip(*pairs)
+                target[list(rows), list(columns)] = 1
+
+    def add_count(self, user_id: int, amount: int = 1) -> None:
+        self.counts[self.columns[user_id]] += amount
+
+    def free_matrix(self, free_users: Sequence[set[int]]) -> np.ndarray:
+        free = np.zeros((len(free_users), len(self.user_ids)), dtype=bool)
+        for row, user_ids in enumerate(free_users):
+            columns = [self.columns[user_id] for user_id in user_ids if user_id in self.columns]
+            free[row, columns] = True
+        return free
+
+    def _lookup(self, matrix: np.ndarray, vocabulary: dict[str, int], values: list[str]) -> np.ndarray:
+        hits = np.zeros((len(values), len(self.user_ids)), dtype=bool)
+        indices = np.array([vocabulary.get(value, -1) for value in values], dtype=np.int64)
+        known = indices >= 0
+        if known.any():
+            hits[known] = matrix[:, indices[known]].T
+        return hits
+
+    def score(
+        self,
+        events: Sequence[models.Event],
+        free: np.ndarray,
+        volunteers: Sequence[set[int]],
+    ) -> ScoreMatrix:
+        location_hits = self._lookup(
+            self.preferred_locations, self.locations, [event.location for event in events]
+        )
+        type_hits = self._lookup(
+            self.favorite_types, self.event_types, [event.type for event in events]
+        )
+        partner_hits = (free.astype(np.float32) @ self.partners.T) > 0
+        weekdays = np.array([event.start_time.weekday() for event in events], dtype=np.int64)
+        weekday_hits = ((self.weekday_masks[None, :] >> weekdays[:, None]) & 1).astype(bool)
+        spans = np.array(
+            [minute_span(event.start_time, event.end_time) for event in events], dtype=np.int32
+        ).reshape(len(events), 2)
+        time_hits = (
+            (self.range_starts[None, :, :] <= spans[:, 0, None, None])
+            & (spans[:, 1, None, None] <= self.range_ends[None, :, :])
+        ).any(axis=2)
+        volunteer_hits = self.free_matrix(volunteers)
+        requires_experienced = np.array([event.requires_experienced for event in events], dtype=bool)
+        eligible = free & ~(requires_experienced[:, None] & self.inexperienced[None, :])
+        bonus = -(
+            LOCATION_BONUS * location_hits
+            + EVENT_TYPE_BONUS * type_hits
+            + PARTNER_BONUS * partner_hits
+            + WEEKDAY_BONUS * weekday_hits
+            + TIME_OF_DAY_BONUS * time_hits
+            + VOLUNTEER_BONUS * volunteer_hits
+        )
+        return ScoreMatrix(
+            self,
+            eligible,
+            bonus,
+            location_hits,
+            type_hits,
+            partner_hits,
+            weekday_hits,
+            time_hits,
+            volunteer_hits,
+        )
+
+
+class ScoreMatrix:
+    def __init__(
+        self,
+        kernel: ScoringKernel,
+        eligible: np.ndarray,
+        bonus: np.ndarray,
+        location_hits: np.ndarray,
+        type_hits: np.ndarray,
+        partner_hits: np.ndarray,
+        weekday_hits: np.ndarray,
+        time_hits: np.ndarray,
+        volunteer_hits: np.ndarray,
+    ) -> None:
+        self.kernel = kernel
+        self.eligible = eligible
+        self.bonus = bonus
+        self.location_hits = location_hits
+        self.type_hits = type_hits
+        self.partner_hits = partner_hits
+        self.weekday_hits = weekday_hits
+        self.time_hits = time_hits
+        self.volunteer_hits = volunteer_hits
+
+    def scores(self, row: int, excluded: np.ndarray | None = None) -> np.ndarray:
+        scores = self.kernel.counts + self.bonus[row]
+        mask = self.eligible[row] if excluded is None else self.eligible[row] & ~excluded
+        return np.where(mask, scores, np.inf)
+
+    def top(self, row: int, limit: int, excluded: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+        scores = self.scores(row, excluded)
+        order = np.argsort(scores, kind="stable")[:limit]
+        order = order[np.isfinite(scores[order])]
+        return order, scores[order]
+
+    def reason(self, row: int, column: int) -> str:
+        reasons = ["Fairness basierend auf bisherigen Einsätzen"]
+        if self.location_hits[row, column]:
+            reasons.append("Bevorzugter Ort")
+        if self.type_hits[row, column]:
+            reasons.append("Lieblingsgottesdienst")
+        if self.partner_hits[row, column]:
+            reasons.append("Wunschpartner verfügbar")
+        if self.weekday_hits[row, column]:
+            reasons.append("Bevorzugter Wochentag")
+        if self.time_hits[row, column]:
+            reasons.append("Bevorzugte Uhrzeit")
+        if self.volunteer_hits[row, column]:
+            reasons.append("Freiwillige Zusage")
+        return "; ".join(reasons)
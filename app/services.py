@@ -1,12 +1,33 @@
 from __future__ import annotations
 
+import os
 from collections import defaultdict
 from datetime import datetime
-from typing import List
+from typing import Iterable, Iterator, List
 
+import numpy as np
+from sqlalchemy import func, insert
 from sqlalchemy.orm import Session
 
-from . import models
+from . import (
+    availability,
+    backups,
+    conflicts,
+    fairness,
+    feeds,
+    gamification,
+    matching,
+    models,
+    partners,
+    preferences,
+    recurrence,
+    schemas,
+    scoring,
+    swaps,
+)
+from .preferences import PreferenceProfile
+
+DEFAULT_NOTIFICATION_CHANNEL = os.getenv("NOTIFICATION_CHANNEL", "in_app")
 
 
 class ScoredCandidate:
@@ -17,77 +38,469 @@ class ScoredCandidate:
 
 
 def _load_availability(db: Session, event: models.Event) -> set[int]:
-    availability = (
-        db.query(models.Availability)
+    return availability.get_index(db, event.church_id).free_users(event.start_time, event.end_time)
+
+
+def _assignment_counts(db: Session, church_id: int) -> dict[int, int]:
+    return fairness.assignment_counts(db, church_id)
+
+
+def _load_servers(db: Session, church_id: int) -> list[models.User]:
+    return (
+        db.query(models.User)
         .filter(
-            models.Availability.start_time <= event.start_time,
-            models.Availability.end_time >= event.end_time,
-            models.Availability.available.is_(True),
+            models.User.church_id == church_id,
+            models.User.active.is_(True),
+            models.User.role == models.Role.server,
         )
         .all()
     )
-    return {item.user_id for item in availability}
 
 
-def _assignment_counts(db: Session, church_id: int) -> dict[int, int]:
-    counts: dict[int, int] = defaultdict(int)
-    assignments = (
-        db.query(models.Assignment)
-        .join(models.Event, models.Assignment.event_id == models.Event.id)
-        .filter(models.Event.church_id == church_id)
+def _load_preferences(db: Session, user_ids: list[int]) -> dict[int, PreferenceProfile]:
+    return preferences.load_profiles(db, user_ids)
+
+
+def _load_volunteers(db: Session, event_ids: list[int]) -> dict[int, set[int]]:
+    volunteers: dict[int, set[int]] = defaultdict(set)
+    if not event_ids:
+        return volunteers
+    for volunteer in (
+        db.query(models.VolunteerInterest)
+        .filter(models.VolunteerInterest.event_id.in_(event_ids))
         .all()
-    )
-    for assignment in assignments:
-        counts[assignment.user_id] += 1
-    return counts
+    ):
+        volunteers[volunteer.event_id].add(volunteer.user_id)
+    return volunteers
+
+
+def _ranked_candidates(
+    matrix: scoring.ScoreMatrix,
+    row: int,
+    limit: int,
+    excluded: np.ndarray | None = None,
+) -> list[ScoredCandidate]:
+    columns, scores = matrix.top(row, limit, excluded)
+    return [
+        ScoredCandidate(matrix.kernel.user_ids[column], float(score), matrix.reason(row, column))
+        for column, score in zip(columns.tolist(), scores.tolist())
+    ]
 
 
 def suggest_assignments(db: Session, event: models.Event) -> List[ScoredCandidate]:
     available_users = _load_availability(db, event)
     assignment_counts = _assignment_counts(db, event.church_id)
-    volunteers = {
-        volunteer.user_id
-        for volunteer in db.query(models.VolunteerInterest)
-        .filter(models.VolunteerInterest.event_id == event.id)
+    volunteers = _load_volunteers(db, [event.id])
+    users = _load_servers(db, event.church_id)
+    preferences = _load_preferences(db, [user.id for user in users])
+    kernel = scoring.ScoringKernel(users, preferences, assignment_counts)
+    matrix = kernel.score([event], kernel.free_matrix([available_users]), [volunteers[event.id]])
+    return _ranked_candidates(matrix, 0, event.required_slots)
+
+
+def _co_place_partners(
+    matrix: scoring.ScoreMatrix,
+    placed: dict[int, list[int]],
+    open_slots: dict[int, int],
+    booked: np.ndarray,
+) -> None:
+    groups = matrix.kernel.groups
+    in_cluster = {column for columns in placed.values() for column in columns}
+    for row, columns in placed.items():
+        anchors = {int(groups[column]) for column in columns if groups[column] >= 0}
+        if not anchors:
+            continue
+        scores = matrix.scores(row, booked)
+        for group in sorted(anchors):
+            members = np.flatnonzero(groups == group).tolist()
+            for partner in sorted(members, key=lambda column: scores[column]):
+                if partner in in_cluster or not np.isfinite(scores[partner]):
+                    continue
+                if len(columns) < open_slots[row]:
+                    columns.append(partner)
+                    in_cluster.add(partner)
+                    continue
+                victims = [
+                    column
+                    for column in columns
+                    if groups[column] < 0
+                    or (
+                        groups[column] != group
+                        and sum(groups[other] == groups[column] for other in columns) == 1
+                    )
+                ]
+                if not victims:
+                    break
+                victim = max(victims, key=lambda column: scores[column])
+                if scores[partner] - scores[victim] > scoring.PARTNER_GROUP_TOLERANCE:
+                    continue
+                columns[columns.index(victim)] = partner
+                in_cluster.discard(victim)
+                in_cluster.add(partner)
+
+
+def _fill_non_overlapping(
+    cluster: list[tuple[int, models.Event]],
+    open_events: list[tuple[int, models.Event, int]],
+    matrix: scoring.ScoreMatrix,
+    existing: list[set[int]],
+    placed: dict[int, list[int]],
+    planned: np.ndarray,
+    capacity: int | None,
+) -> None:
+    # The joint solve allows one slot per server across the whole chained cluster; events
+    # that do not overlap pairwise may still share a server, so top up the open slots here.
+    kernel = matrix.kernel
+    extra = np.zeros(len(kernel.user_ids), dtype=np.int64)
+    for column in (column for columns in placed.values() for column in columns):
+        extra[column] += 1
+    for row, event, open_slots in open_events:
+        missing = open_slots - len(placed[row])
+        if missing <= 0:
+            continue
+        busy: set[int] = set()
+        for other_row, other in cluster:
+            if other.start_time < event.end_time and other.end_time > event.start_time:
+                busy |= existing[other_row]
+                busy.update(kernel.user_ids[column] for column in placed[other_row])
+        booked = kernel.free_matrix([busy])[0]
+        if capacity is not None:
+            booked |= planned + extra >= capacity
+        columns, _ = matrix.top(row, missing, booked)
+        for column in columns.tolist():
+            placed[row].append(column)
+            extra[column] += 1
+
+
+def _plan_cluster(
+    cluster: list[tuple[int, models.Event]],
+    matrix: scoring.ScoreMatrix,
+    existing: list[set[int]],
+    planned: np.ndarray,
+    capacity: int | None,
+) -> dict[int, list[ScoredCandidate]]:
+    kernel = matrix.kernel
+    booked = kernel.free_matrix([set().union(*(existing[row] for row, _ in cluster))])[0]
+    if capacity is not None:
+        booked |= planned >= capacity
+    open_events: list[tuple[int, models.Event, int]] = []
+    for row, event in cluster:
+        open_slots = event.required_slots - len(existing[row])
+        if open_slots > 0:
+            open_events.append((row, event, open_slots))
+    total_slots = sum(open_slots for _, _, open_slots in open_events)
+    if not total_slots:
+        return {}
+
+    # An optimal matching never needs more than total_slots candidates per event.
+    candidate_columns: list[int] = []
+    seen: set[int] = set()
+    for row, _, _ in open_events:
+        columns, _ = matrix.top(row, total_slots, booked)
+        for column in columns.tolist():
+            if column not in seen:
+                seen.add(column)
+                candidate_columns.append(column)
+
+    slots = {row: open_slots for row, _, open_slots in open_events}
+    row_events: list[tuple[int, models.Event]] = []
+    cost: list[list[float]] = []
+    unfilled = [matching.UNFILLED] * total_slots
+    for row, event, open_slots in open_events:
+        scores = matrix.scores(row, booked)[candidate_columns]
+        cost_row = np.where(np.isfinite(scores), scores, matching.FORBIDDEN).tolist() + unfilled
+        for _ in range(open_slots):
+            row_events.append((row, event))
+            cost.append(cost_row)
+
+    placed: dict[int, list[int]] = defaultdict(list)
+    for (row, event), position in zip(row_events, matching.solve_assignment(cost)):
+        if position >= len(candidate_columns):
+            continue
+        column = candidate_columns[position]
+        if not matrix.eligible[row, column] or booked[column]:
+            continue
+        placed[row].append(column)
+    _co_place_partners(matrix, placed, slots, booked)
+    _fill_non_overlapping(cluster, open_events, matrix, existing, placed, planned, capacity)
+
+    plan: dict[int, list[ScoredCandidate]] = {}
+    for row, event, _ in open_events:
+        columns = placed.get(row, [])
+        candidates: list[ScoredCandidate] = []
+        for column in columns:
+            score = float(kernel.counts[column] + matrix.bonus[row, column])
+            reason = matrix.reason(row, column)
+            group = kernel.groups[column]
+            if group >= 0 and sum(kernel.groups[other] == group for other in columns) > 1:
+                reason += "; Gemeinsam mit Wunschpartner eingeteilt"
+            candidates.append(ScoredCandidate(kernel.user_ids[column], score, reason))
+        if candidates:
+            plan[row] = sorted(candidates, key=lambda item: item.score)
+    return plan
+
+
+def suggest_church_plan(
+    db: Session,
+    church_id: int,
+    start_time: datetime,
+    end_time: datetime,
+    capacity: int | None = None,
+) -> list[tuple[models.Event | recurrence.Occurrence, list[ScoredCandidate]]]:
+    events = recurrence.expand(db, church_id, start_time, end_time)
+    if not events:
+        return []
+
+    event_ids = [event.id for event in events if event.id is not None]
+    users = _load_servers(db, church_id)
+    preferences = _load_preferences(db, [user.id for user in users])
+    volunteers = _load_volunteers(db, event_ids)
+    kernel = scoring.ScoringKernel(
+        users,
+        preferences,
+        _assignment_counts(db, church_id),
+        partners.get_graph(church_id, preferences).group_of,
+    )
+    free_users = availability.get_index(db, church_id).free_users_many(
+        [(event.start_time, event.end_time) for event in events]
+    )
+    matrix = kernel.score(
+        events,
+        kernel.free_matrix(free_users),
+        [volunteers[event.id] if event.id is not None else set() for event in events],
+    )
+    assigned: dict[int, set[int]] = defaultdict(set)
+    if event_ids:
+        for event_id, user_id in (
+            db.query(models.Assignment.event_id, models.Assignment.user_id)
+            .filter(models.Assignment.event_id.in_(event_ids))
+            .all()
+        ):
+            assigned[event_id].add(user_id)
+    existing = [assigned[event.id] if event.id is not None else set() for event in events]
+
+    rows = {event: row for row, event in enumerate(events)}
+    planned = np.zeros(len(kernel.user_ids), dtype=np.int64)
+    suggestions: list[tuple[models.Event | recurrence.Occurrence, list[ScoredCandidate]]] = []
+    for cluster in matching.overlap_clusters(events):
+        plan = _plan_cluster(
+            [(rows[event], event) for event in cluster],
+            matrix,
+            existing,
+            planned,
+            capacity,
+        )
+        for event in cluster:
+            candidates = plan.get(rows[event], [])
+            for candidate in candidates:
+                kernel.add_count(candidate.user_id)
+                planned[kernel.columns[candidate.user_id]] += 1
+            suggestions.append((event, candidates))
+    return suggestions
+
+
+def plan_church_events(
+    db: Session,
+    church_id: int,
+    start_time: datetime,
+    end_time: datetime,
+    capacity: int | None = None,
+) -> list[models.Assignment]:
+    rows: list[dict] = []
+    deltas = fairness.TallyDeltas()
+    materialized = False
+    for event, candidates in suggest_church_plan(db, church_id, start_time, end_time, capacity):
+        if candidates and isinstance(event, recurrence.Occurrence):
+            event = recurrence.materialize(db, event.series, event.occurrence_start)
+            materialized = True
+        for candidate in candidates:
+            rows.append(
+                {
+                    "event_id": event.id,
+                    "user_id": candidate.user_id,
+                    "status": models.AssignmentStatus.proposed,
+                    "source": "algorithm",
+                }
+            )
+            deltas.add(church_id, candidate.user_id, event.start_time, assigned=1)
+    if not rows:
+        return []
+    assignment_ids = list(
+        db.scalars(insert(models.Assignment).returning(models.Assignment.id), rows)
+    )
+    fairness.apply(db, deltas)
+    swaps.prune_candidates(db, {row["user_id"] for row in rows})
+    db.commit()
+    if materialized:
+        feeds.cache.invalidate(church_id)
+    return (
+        db.query(models.Assignment)
+        .filter(models.Assignment.id.in_(assignment_ids))
+        .order_by(models.Assignment.id)
         .all()
-    }
+    )
 
-    candidates: list[ScoredCandidate] = []
-    users = (
-        db.query(models.User)
-        .filter(
-            models.User.church_id == event.church_id,
-            models.User.active.is_(True),
-            models.User.role == models.Role.server,
+
+def _fill_slots(
+    db: Session,
+    church_id: int,
+    events: list[models.Event],
+    open_slots: dict[int, int],
+) -> dict[int, list[ScoredCandidate]]:
+    if not events:
+        return {}
+    users = _load_servers(db, church_id)
+    preferences = _load_preferences(db, [user.id for user in users])
+    volunteers = _load_volunteers(db, [event.id for event in events])
+    kernel = scoring.ScoringKernel(users, preferences, _assignment_counts(db, church_id))
+    free_users = availability.get_index(db, church_id).free_users_many(
+        [(event.start_time, event.end_time) for event in events]
+    )
+    matrix = kernel.score(
+        events, kernel.free_matrix(free_users), [volunteers[event.id] for event in events]
+    )
+    picked: list[tuple[models.Event, set[int]]] = []
+    filled: dict[int, list[ScoredCandidate]] = {}
+    for row, event in enumerate(events):
+        blocked = conflicts.blocked_users(db, event, kernel.user_ids)
+        for other, user_ids in picked:
+            if other.start_time < event.end_time and other.end_time > event.start_time:
+                blocked |= user_ids
+        candidates = _ranked_candidates(
+            matrix, row, open_slots.get(event.id, 0), kernel.free_matrix([blocked])[0]
         )
+        for candidate in candidates:
+            kernel.add_count(candidate.user_id)
+        picked.append((event, {candidate.user_id for candidate in candidates}))
+        filled[event.id] = candidates
+    return filled
+
+
+def propose_open_slots(db: Session, event: models.Event) -> list[ScoredCandidate]:
+    assigned = (
+        db.query(func.count(models.Assignment.id))
+        .filter(models.Assignment.event_id == event.id)
+        .scalar()
+    )
+    open_slots = event.required_slots - assigned
+    if open_slots <= 0:
+        return []
+    return _fill_slots(db, event.church_id, [event], {event.id: open_slots})[event.id]
+
+
+class PlanChange:
+    def __init__(
+        self,
+        assignment: models.Assignment,
+        previous_user_id: int,
+        candidate: ScoredCandidate | None,
+        conflict: str,
+    ) -> None:
+        self.assignment_id = assignment.id
+        self.event_id = assignment.event_id
+        self.previous_user_id = previous_user_id
+        self.user_id = candidate.user_id if candidate else None
+        self.score = candidate.score if candidate else None
+        self.reason = candidate.reason if candidate else ""
+        self.conflict = conflict
+
+
+def _invalidated(
+    db: Session, found: list[conflicts.Conflict]
+) -> dict[int, tuple[models.Assignment, str]]:
+    involved = {
+        assignment_id
+        for conflict in found
+        for assignment_id in (conflict.assignment_id, conflict.other_assignment_id)
+        if assignment_id is not None
+    }
+    if not involved:
+        return {}
+    assignments = {
+        assignment.id: assignment
+        for assignment in db.query(models.Assignment).filter(models.Assignment.id.in_(involved))
+    }
+    invalid: dict[int, tuple[models.Assignment, str]] = {}
+    for conflict in found:
+        assignment = assignments[conflict.assignment_id]
+        if conflict.kind == conflicts.OVERLAP:
+            other = assignments[conflict.other_assignment_id]
+            if other.id in invalid or assignment.id in invalid:
+                continue
+            # Keep confirmed assignments where possible, otherwise the older one.
+            if (other.status == models.AssignmentStatus.proposed) != (
+                assignment.status == models.AssignmentStatus.proposed
+            ):
+                if other.status == models.AssignmentStatus.proposed:
+                    assignment = other
+            elif other.id > assignment.id:
+                assignment = other
+        invalid.setdefault(assignment.id, (assignment, conflict.kind))
+    return invalid
+
+
+def repair_plan(
+    db: Session,
+    church_id: int,
+    start_time: datetime,
+    end_time: datetime | None = None,
+    user_ids: Iterable[int] | None = None,
+    commit: bool = True,
+) -> list[PlanChange]:
+    found = conflicts.find(db, church_id, start_time, end_time)
+    if user_ids is not None:
+        user_ids = set(user_ids)
+        found = [conflict for conflict in found if conflict.user_id in user_ids]
+    found = [conflict for conflict in found if conflict.start_time >= start_time]
+    invalid = _invalidated(db, found)
+    if not invalid:
+        return []
+
+    event_ids = {assignment.event_id for assignment, _ in invalid.values()}
+    events = (
+        db.query(models.Event)
+        .filter(models.Event.id.in_(event_ids))
+        .order_by(models.Event.start_time, models.Event.id)
         .all()
     )
-    for user in users:
-        if user.id not in available_users:
-            continue
-        if event.requires_experienced and user.experience_level < 2:
+    open_slots: dict[int, int] = defaultdict(int)
+    for assignment, _ in invalid.values():
+        open_slots[assignment.event_id] += 1
+    filled = _fill_slots(db, church_id, events, open_slots)
+
+    starts = {event.id: event.start_time for event in events}
+    changes: list[PlanChange] = []
+    deltas = fairness.TallyDeltas()
+    for assignment, kind in sorted(
+        invalid.values(), key=lambda item: (starts[item[0].event_id], item[0].id)
+    ):
+        candidates = filled.get(assignment.event_id, [])
+        candidate = candidates.pop(0) if candidates else None
+        previous_user_id = assignment.user_id
+        changes.append(PlanChange(assignment, previous_user_id, candidate, kind))
+        if candidate is None:
             continue
-        score = float(assignment_counts.get(user.id, 0))
-        reasons: list[str] = ["Fairness basierend auf bisherigen Einsätzen"]
-        preference = db.query(models.Preference).filter_by(user_id=user.id).first()
-        if preference:
-            if event.location in preference.preferred_locations:
-                score -= 1.0
-                reasons.append("Bevorzugter Ort")
-            if event.type in preference.favorite_event_types:
-                score -= 0.5
-                reasons.append("Lieblingsgottesdienst")
-            if preference.partner_user_ids:
-                if any(partner_id in available_users for partner_id in preference.partner_user_ids):
-                    score -= 0.25
-                    reasons.append("Wunschpartner verfügbar")
-        if user.id in volunteers:
-            score -= 1.5
-            reasons.append("Freiwillige Zusage")
-        candidates.append(ScoredCandidate(user.id, score, "; ".join(reasons)))
-
-    candidates.sort(key=lambda item: item.score)
-    return candidates[: event.required_slots]
+        start = starts[assignment.event_id]
+        deltas.add(
+            church_id,
+            previous_user_id,
+            start,
+            assigned=-1,
+            approved=-int(assignment.status == models.AssignmentStatus.approved),
+        )
+        deltas.add(church_id, candidate.user_id, start, assigned=1)
+        assignment.user_id = candidate.user_id
+        assignment.status = models.AssignmentStatus.proposed
+        assignment.source = "repair"
+        assignment.approved_at = None
+    fairness.apply(db, deltas)
+    swaps.decline_open_swaps(
+        db, [change.assignment_id for change in changes if change.user_id is not None]
+    )
+    swaps.prune_candidates(db, {change.user_id for change in changes if change.user_id is not None})
+    if commit:
+        db.commit()
+    return changes
 
 
 def create_assignments_from_suggestion(
@@ -96,7 +509,11 @@ def create_assignments_from_suggestion(
     suggestion: List[ScoredCandidate],
 ) -> list[models.Assignment]:
     assignments: list[models.Assignment] = []
+    deltas = fairness.TallyDeltas()
+    blocked = conflicts.blocked_users(db, event, [item.user_id for item in suggestion])
     for item in suggestion:
+        if item.user_id in blocked:
+            continue
         assignment = models.Assignment(
             event_id=event.id,
             user_id=item.user_id,
@@ -105,6 +522,9 @@ def create_assignments_from_suggestion(
         )
         db.add(assignment)
         assignments.append(assignment)
+        deltas.add(event.church_id, item.user_id, event.start_time, assigned=1)
+    fairness.apply(db, deltas)
+    swaps.prune_candidates(db, {assignment.user_id for assignment in assignments})
     db.commit()
     for assignment in assignments:
         db.refresh(assignment)
@@ -112,12 +532,7 @@ def create_assignments_from_suggestion(
 
 
 def create_swap_request(db: Session, assignment: models.Assignment, requested_user_ids: list[int]) -> models.SwapRequest:
-    swap_request = models.SwapRequest(
-        assignment_id=assignment.id,
-        status=models.SwapStatus.open,
-        requested_user_ids=requested_user_ids,
-    )
-    db.add(swap_request)
+    swap_request = swaps.open_swap(db, assignment, requested_user_ids)
     db.commit()
     db.refresh(swap_request)
     return swap_request
@@ -127,14 +542,26 @@ def accept_swap_request(
     db: Session,
     swap_request: models.SwapRequest,
     replacement_user_id: int,
+    commit: bool = True,
 ) -> models.Assignment:
+    swaps.claim(db, swap_request, replacement_user_id)
     assignment = swap_request.assignment
+    event = assignment.event
+    deltas = fairness.TallyDeltas()
+    deltas.add(
+        event.church_id,
+        assignment.user_id,
+        event.start_time,
+        assigned=-1,
+        approved=-int(assignment.status == models.AssignmentStatus.approved),
+    )
+    deltas.add(event.church_id, replacement_user_id, event.start_time, assigned=1)
+    fairness.apply(db, deltas)
     assignment.user_id = replacement_user_id
     assignment.status = models.AssignmentStatus.swapped
-    swap_request.status = models.SwapStatus.accepted
-    swap_request.replacement_user_id = replacement_user_id
-    db.commit()
-    db.refresh(assignment)
+    if commit:
+        db.commit()
+        db.refresh(assignment)
     return assignment
 
 
@@ -143,67 +570,301 @@ def award_points(
     user_id: int,
     points: int,
     badge: str | None = None,
-) -> models.Gamification:
-    entry = db.query(models.Gamification).filter_by(user_id=user_id).first()
-    if not entry:
-        entry = models.Gamification(user_id=user_id, points=0, badges=[], level=1, streak=0)
-        db.add(entry)
-    entry.points += points
-    entry.level = max(1, entry.points // 50 + 1)
-    if badge and badge not in entry.badges:
-        entry.badges.append(badge)
-    entry.streak += 1
-    db.commit()
-    db.refresh(entry)
+    commit: bool = True,
+    reason: str = "",
+) -> models.PointsLedger:
+    entry = gamification.award(db, user_id, points, badge, reason)
+    if commit:
+        gamification.refresh(db, [user_id], commit=False)
+        db.commit()
     return entry
 
 
-def create_notification(db: Session, user_id: int, title: str, message: str) -> models.Notification:
-    notification = models.Notification(user_id=user_id, title=title, message=message)
+def create_notification(
+    db: Session,
+    user_id: int,
+    title: str,
+    message: str,
+    commit: bool = True,
+    channel: str = DEFAULT_NOTIFICATION_CHANNEL,
+) -> models.Notification:
+    notification = models.Notification(
+        user_id=user_id,
+        title=title,
+        message=message,
+        channel=channel,
+    )
     db.add(notification)
-    db.commit()
-    db.refresh(notification)
+    if commit:
+        db.commit()
+        db.refresh(notification)
     return notification
 
 
-def suggest_backup_candidates(db: Session, start_time: datetime, end_time: datetime) -> List[int]:
-    pool = (
-        db.query(models.BackupPool)
-        .filter(
-            models.BackupPool.active.is_(True),
-            models.BackupPool.start_time <= start_time,
-            models.BackupPool.end_time >= end_time,
+def approve_assignments(
+    db: Session,
+    assignments: list[models.Assignment],
+) -> list[models.Assignment]:
+    pending = [
+        assignment
+        for assignment in assignments
+        if assignment.status != models.AssignmentStatus.approved
+    ]
+    approved_at = datetime.utcnow()
+    events = fairness.event_keys(db, {assignment.event_id for assignment in pending})
+    deltas = fairness.TallyDeltas()
+    for assignment in pending:
+        church_id, start_time = events[assignment.event_id]
+        deltas.add(church_id, assignment.user_id, start_time, approved=1)
+        assignment.status = models.AssignmentStatus.approved
+        assignment.approved_at = approved_at
+        gamification.award(
+            db, assignment.user_id, 5, "zuverlaessig", "Einsatz bestätigt", church_id
         )
+        create_notification(
+            db,
+            user_id=assignment.user_id,
+            title="Einsatz bestätigt",
+            message="Dein Einsatz wurde bestätigt. Vielen Dank!",
+            commit=False,
+        )
+    fairness.apply(db, deltas)
+    gamification.refresh(db, {assignment.user_id for assignment in pending}, commit=False)
+    db.commit()
+    assignment_ids = [assignment.id for assignment in assignments]
+    return (
+        db.query(models.Assignment)
+        .filter(models.Assignment.id.in_(assignment_ids))
+        .order_by(models.Assignment.id)
         .all()
     )
-    candidates = [item.user_id for item in pool]
-    availability = (
-        db.query(models.Availability)
+
+
+BackupRequest = tuple[datetime, datetime, str | None, bool]
+
+
+def _rank_backups(
+    db: Session,
+    church_id: int,
+    requests: list[BackupRequest],
+    limit: int | None = None,
+) -> list[list[ScoredCandidate]]:
+    index = backups.get_index(db, church_id)
+    covering = [index.covering(start, end) for start, end, _, _ in requests]
+    user_ids = set().union(*covering) if covering else set()
+    if not user_ids:
+        return [[] for _ in requests]
+    experience = dict(
+        db.query(models.User.id, models.User.experience_level).filter(
+            models.User.id.in_(user_ids),
+            models.User.active.is_(True),
+        )
+    )
+    counts = _assignment_counts(db, church_id)
+    free = availability.get_index(db, church_id).free_users_many(
+        [(start, end) for start, end, _, _ in requests]
+    )
+    booked: dict[int, list[tuple[datetime, datetime]]] = defaultdict(list)
+    for user_id, start, end in (
+        db.query(models.Assignment.user_id, models.Event.start_time, models.Event.end_time)
+        .join(models.Event, models.Assignment.event_id == models.Event.id)
+        .filter(
+            models.Assignment.user_id.in_(user_ids),
+            models.Event.start_time < max(end for _, end, _, _ in requests),
+            models.Event.end_time > min(start for start, _, _, _ in requests),
+        )
+    ):
+        booked[user_id].append((start, end))
+
+    results: list[list[ScoredCandidate]] = []
+    for (start, end, location, requires_experienced), candidates, free_users in zip(
+        requests, covering, free
+    ):
+        ranked: list[ScoredCandidate] = []
+        for user_id, locations in candidates.items():
+            level = experience.get(user_id)
+            if level is None or user_id not in free_users:
+                continue
+            if requires_experienced and level < 2:
+                continue
+            if any(
+                other_start < end and other_end > start
+                for other_start, other_end in booked[user_id]
+            ):
+                continue
+            score = float(counts.get(user_id, 0)) - scoring.EXPERIENCE_BONUS * level
+            reasons = ["Fairness basierend auf bisherigen Einsätzen"]
+            if location and location in locations:
+                score -= scoring.LOCATION_BONUS
+                reasons.append("Bevorzugter Ort")
+            if level >= 2:
+                reasons.append("Erfahrene*r Messdiener*in")
+            ranked.append(ScoredCandidate(user_id, score, "; ".join(reasons)))
+        ranked.sort(key=lambda item: (item.score, item.user_id))
+        results.append(ranked[:limit] if limit else ranked)
+    return results
+
+
+def suggest_backup_candidates(
+    db: Session,
+    start_time: datetime,
+    end_time: datetime,
+    church_id: int | None = None,
+    location: str | None = None,
+) -> List[ScoredCandidate]:
+    if church_id is not None:
+        church_ids = [church_id]
+    else:
+        church_ids = [
+            user_church_id
+            for (user_church_id,) in db.query(models.User.church_id)
+            .join(models.BackupPool, models.BackupPool.user_id == models.User.id)
+            .filter(
+                models.BackupPool.active.is_(True),
+                models.BackupPool.start_time <= start_time,
+                models.BackupPool.end_time >= end_time,
+            )
+            .distinct()
+        ]
+    candidates: list[ScoredCandidate] = []
+    for current_church_id in church_ids:
+        candidates.extend(
+            _rank_backups(db, current_church_id, [(start_time, end_time, location, False)])[0]
+        )
+    return sorted(candidates, key=lambda item: (item.score, item.user_id))
+
+
+def suggest_event_backups(
+    db: Session,
+    event: models.Event,
+    limit: int | None = None,
+) -> List[ScoredCandidate]:
+    request = (event.start_time, event.end_time, event.location, event.requires_experienced)
+    return _rank_backups(db, event.church_id, [request], limit)[0]
+
+
+def suggest_understaffed_backups(
+    db: Session,
+    church_id: int,
+    start_time: datetime,
+    end_time: datetime,
+    limit: int | None = None,
+) -> list[tuple[models.Event, list[ScoredCandidate]]]:
+    staffed = (
+        db.query(models.Assignment.event_id, func.count(models.Assignment.id).label("staffed"))
+        .group_by(models.Assignment.event_id)
+        .subquery()
+    )
+    events = (
+        db.query(models.Event)
+        .outerjoin(staffed, staffed.c.event_id == models.Event.id)
         .filter(
-            models.Availability.start_time <= start_time,
-            models.Availability.end_time >= end_time,
-            models.Availability.available.is_(True),
+            models.Event.church_id == church_id,
+            models.Event.start_time >= start_time,
+            models.Event.start_time < end_time,
+            func.coalesce(staffed.c.staffed, 0) < models.Event.required_slots,
         )
+        .order_by(models.Event.start_time, models.Event.id)
         .all()
     )
-    available_users = {item.user_id for item in availability}
-    return [user_id for user_id in candidates if user_id in available_users]
+    if not events:
+        return []
+    ranked = _rank_backups(
+        db,
+        church_id,
+        [
+            (event.start_time, event.end_time, event.location, event.requires_experienced)
+            for event in events
+        ],
+        limit,
+    )
+    return list(zip(events, ranked))
 
 
-def build_public_events_ics(events: list[models.Event]) -> str:
-    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//MesseCall//DE"]
-    for event in events:
-        lines.extend(
-            [
-                "BEGIN:VEVENT",
-                f"UID:event-{event.id}@messecall",
-                f"DTSTART:{event.start_time.strftime('%Y%m%dT%H%M%SZ')}",
-                f"DTEND:{event.end_time.strftime('%Y%m%dT%H%M%SZ')}",
-                f"SUMMARY:{event.type}",
-                f"LOCATION:{event.location}",
-                f"DESCRIPTION:{event.description}",
-                "END:VEVENT",
-            ]
+def _ics_escape(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+        .replace("\r", "\\n")
+    )
+
+
+def _ics_fold(line: str) -> str:
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts: list[str] = []
+    start = 0
+    limit = 75
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode("utf-8"))
+        start = end
+        limit = 74
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _ics_event(uid: str, start: datetime, end: datetime, event, rules: Iterable[str] = ()) -> str:
+    return "".join(
+        _ics_fold(line)
+        for line in (
+            "BEGIN:VEVENT",
+            f"UID:{uid}@messecall",
+            f"DTSTART:{start.strftime(recurrence.ICS_TIME)}",
+            f"DTEND:{end.strftime(recurrence.ICS_TIME)}",
+            *rules,
+            f"SUMMARY:{_ics_escape(event.type)}",
+            f"LOCATION:{_ics_escape(event.location)}",
+            f"DESCRIPTION:{_ics_escape(event.description or '')}",
+            "END:VEVENT",
         )
-    lines.append("END:VCALENDAR")
-    return "\r\n".join(lines)
+    )
+
+
+def iter_public_events_ics(
+    events: Iterable[models.Event],
+    series: Iterable[models.EventSeries] = (),
+) -> Iterator[str]:
+    series = list(series)
+    covered = {item.id for item in series}
+    yield _ics_fold("BEGIN:VCALENDAR")
+    yield _ics_fold("VERSION:2.0")
+    yield _ics_fold("PRODID:-//MesseCall//DE")
+    for event in events:
+        if event.series_id in covered:
+            continue
+        yield _ics_event(f"event-{event.id}", event.start_time, event.end_time, event)
+    for item in series:
+        rules = [f"RRULE:{recurrence.rrule(item)}"]
+        if item.exceptions:
+            rules.append(
+                "EXDATE:"
+                + ",".join(
+                    datetime.fromisoformat(value).strftime(recurrence.ICS_TIME)
+                    for value in item.exceptions
+                )
+            )
+        yield _ics_event(f"series-{item.id}", item.start_time, item.end_time, item, rules)
+    yield _ics_fold("END:VCALENDAR")
+
+
+def iter_events_json(
+    events: Iterable[models.Event | recurrence.Occurrence],
+) -> Iterator[str]:
+    yield "["
+    for position, event in enumerate(events):
+        prefix = "," if position else ""
+        yield prefix + schemas.OccurrenceResponse.model_validate(event).model_dump_json()
+    yield "]"
+
+
+def build_public_events_ics(
+    events: list[models.Event],
+    series: Iterable[models.EventSeries] = (),
+) -> str:
+    return "".join(iter_public_events_ics(events, series))
@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy import delete, exists, or_, select, update
+from sqlalchemy.orm import Query, Session, aliased
+
+from . import availability, models
+
+
+class SwapError(Exception):
+    pass
+
+
+class SwapConflict(SwapError):
+    pass
+
+
+class IneligibleReplacement(SwapError):
+    pass
+
+
+def busy_users(
+    db: Session,
+    start_time: datetime,
+    end_time: datetime,
+    user_ids: Iterable[int],
+) -> set[int]:
+    user_ids = set(user_ids)
+    if not user_ids:
+        return set()
+    return set(
+        db.scalars(
+            select(models.Assignment.user_id)
+            .join(models.Event, models.Assignment.event_id == models.Event.id)
+            .where(
+                models.Assignment.user_id.in_(user_ids),
+                models.Event.start_time < end_time,
+                models.Event.end_time > start_time,
+            )
+        )
+    )
+
+
+def eligible_users(
+    db: Session,
+    church_id: int,
+    start_time: datetime,
+    end_time: datetime,
+    requires_experienced: bool,
+    exclude_user_id: int | None = None,
+    requested_user_ids: Iterable[int] = (),
+) -> set[int]:
+    free = availability.get_index(db, church_id).free_users(start_time, end_time)
+    query = db.query(models.User.id).filter(
+        models.User.church_id == church_id,
+        models.User.active.is_(True),
+        models.User.role == models.Role.server,
+    )
+    if exclude_user_id is not None:
+        query = query.filter(models.User.id != exclude_user_id)
+    if requires_experienced:
+        query = query.filter(models.User.experience_level >= 2)
+    requested_user_ids = list(requested_user_ids)
+    if requested_user_ids:
+        query = query.filter(models.User.id.in_(requested_user_ids))
+    candidates = {user_id for (user_id,) in query if user_id in free}
+    return candidates - busy_users(db, start_time, end_time, candidates)
+
+
+def eligible_candidates(
+    db: Session,
+    assignment: models.Assignment,
+    requested_user_ids: Iterable[int] = (),
+) -> set[int]:
+    event = assignment.event
+    return eligible_users(
+        db,
+        event.church_id,
+        event.start_time,
+        event.end_time,
+        event.requires_experienced,
+        assignment.user_id,
+        requested_user_ids,
+    )
+
+
+def refresh_candidates(db: Session, swap_request: models.SwapRequest) -> None:
+    user_ids = eligible_candidates(
+        db, swap_request.assignment, swap_request.requested_user_ids or ()
+    )
+    swap_request.candidates = [
+        models.SwapCandidate(user_id=user_id) for user_id in sorted(user_ids)
+    ]
+
+
+def open_swap(
+    db: Session,
+    assignment: models.Assignment,
+    requested_user_ids: list[int],
+) -> models.SwapRequest:
+    swap_request = models.SwapRequest(
+        assignment=assignment,
+        status=models.SwapStatus.open,
+        requested_user_ids=requested_user_ids,
+    )
+    db.add(swap_request)
+    refresh_candidates(db, swap_request)
+    return swap_request
+
+
+def prune_candidates(db: Session, user_ids: Iterable[int]) -> None:
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    db.flush()
+    swap_assignment = aliased(models.Assignment)
+    swap_event = aliased(models.Event)
+    busy = (
+        select(models.Assignment.id)
+        .join(models.Event, models.Assignment.event_id == models.Event.id)
+        .where(
+            models.Assignment.user_id == models.SwapCandidate.user_id,
+            models.Event.start_time < swap_event.end_time,
+            models.Event.end_time > swap_event.start_time,
+        )
+        .correlate_except(models.Assignment, models.Event)
+    )
+    blocked = (
+        select(models.Availability.id)
+        .where(
+            models.Availability.user_id == models.SwapCandidate.user_id,
+            models.Availability.available.is_(False),
+            models.Availability.start_time < swap_event.end_time,
+            models.Availability.end_time > swap_event.start_time,
+        )
+        .correlate_except(models.Availability)
+    )
+    stale = (
+        select(models.SwapRequest.id)
+        .join(swap_assignment, models.SwapRequest.assignment_id == swap_assignment.id)
+        .join(swap_event, swap_assignment.event_id == swap_event.id)
+        .where(
+            models.SwapRequest.id == models.SwapCandidate.swap_request_id,
+            models.SwapRequest.status == models.SwapStatus.open,
+            or_(exists(busy), exists(blocked)),
+        )
+    )
+    db.execute(
+        delete(models.SwapCandidate)
+        .where(models.SwapCandidate.user_id.in_(user_ids), exists(stale))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def decline_open_swaps(db: Session, assignment_ids: Iterable[int]) -> None:
+    assignment_ids = set(assignment_ids)
+    if not assignment_ids:
+        return
+    swap_ids = list(
+        db.scalars(
+            select(models.SwapRequest.id).where(
+                models.SwapRequest.assignment_id.in_(assignment_ids),
+                models.SwapRequest.status == models.SwapStatus.open,
+            )
+        )
+    )
+    if not swap_ids:
+        return
+    db.execute(
+        update(models.SwapRequest)
+        .where(
+            models.SwapRequest.id.in_(swap_ids),
+            models.SwapRequest.status == models.SwapStatus.open,
+        )
+        .values(status=models.SwapStatus.declined, version=models.SwapRequest.version + 1)
+        .execution_options(synchronize_session="fetch")
+    )
+    db.execute(
+        delete(models.SwapCandidate)
+        .where(models.SwapCandidate.swap_request_id.in_(swap_ids))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def open_swaps_query(db: Session, user_id: int) -> Query:
+    return (
+        db.query(models.SwapRequest)
+        .join(
+            models.SwapCandidate,
+            models.SwapCandidate.swap_request_id == models.SwapRequest.id,
+        )
+        .join(models.Assignment, models.SwapRequest.assignment_id == models.Assignment.id)
+        .join(models.Event, models.Assignment.event_id == models.Event.id)
+        .filter(
+            models.SwapCandidate.user_id == user_id,
+            models.SwapRequest.status == models.SwapStatus.open,
+            models.Event.start_time >= datetime.utcnow(),
+        )
+    )
+
+
+def claim(db: Session, swap_request: models.SwapRequest, replacement_user_id: int) -> None:
+    if swap_request.status != models.SwapStatus.open:
+        raise SwapConflict("Swap request is no longer open")
+    assignment = swap_request.assignment
+    result = db.execute(
+        update(models.SwapRequest)
+        .where(
+            models.SwapRequest.id == swap_request.id,
+            models.SwapRequest.version == swap_request.version,
+            models.SwapRequest.status == models.SwapStatus.open,
+        )
+        .values(
+            status=models.SwapStatus.accepted,
+            replacement_user_id=replacement_user_id,
+            version=models.SwapRequest.version + 1,
+        )
+        .execution_options(synchronize_session="fetch")
+    )
+    if result.rowcount != 1:
+        raise SwapConflict("Swap request was already taken")
+    listed = db.get(models.SwapCandidate, (swap_request.id, replacement_user_id))
+    if not listed or replacement_user_id not in eligible_candidates(
+        db, assignment, [replacement_user_id]
+    ):
+        raise IneligibleReplacement("Replacement is not eligible for this swap")
+
+    event = assignment.event
+    overlapping_swaps = (
+        select(models.SwapRequest.id)
+        .join(models.Assignment, models.SwapRequest.assignment_id == models.Assignment.id)
+        .join(models.Event, models.Assignment.event_id == models.Event.id)
+        .where(
+            models.SwapRequest.status == models.SwapStatus.open,
+            models.Event.start_time < event.end_time,
+            models.Event.end_time > event.start_time,
+        )
+    )
+    db.execute(
+        delete(models.SwapCandidate)
+        .where(
+            (models.SwapCandidate.swap_request_id == swap_request.id)
+            | (
+                (models.SwapCandidate.user_id == replacement_user_id)
+                & models.SwapCandidate.swap_request_id.in_(overlapping_swaps)
+            )
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.expire(swap_request, ["candidates"])
@@ -0,0 +1,123 @@
+"""Concurrent write throughput against SQLite with and without the PRAGMA tuning.
+
+Usage: python -m benchmarks.db_writes [--threads 8] [--writes 200]
+
+Each run uses a fresh database file in a subprocess so the engine picks up
+the SQLITE_PRAGMAS setting at import time.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+
+def _worker(threads: int, writes: int) -> dict:
+    from sqlalchemy.exc import OperationalError
+
+    from app import models
+    from app.database import Base, SessionLocal, engine
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    church = models.Church(name="Bench", address="-")
+    db.add(church)
+    db.commit()
+    users = [
+        models.User(
+            name=f"Server {index}",
+            email=f"server{index}@bench.invalid",
+            role=models.Role.server,
+            church_id=church.id,
+        )
+        for index in range(threads)
+    ]
+    db.add_all(users)
+    db.commit()
+    user_ids = [user.id for user in users]
+    db.close()
+
+    errors = 0
+    lock = threading.Lock()
+
+    def write(user_id: int) -> None:
+        nonlocal errors
+        start = datetime(2026, 1, 1)
+        for index in range(writes):
+            session = SessionLocal()
+            try:
+                session.add(
+                    models.Availability(
+                        user_id=user_id,
+                        start_time=start + timedelta(days=index),
+                        end_time=start + timedelta(days=index, hours=12),
+                    )
+                )
+                session.commit()
+            except OperationalError:
+                session.rollback()
+                with lock:
+                    errors += 1
+            finally:
+                session.close()
+
+    workers = [threading.Thread(target=write, args=(user_id,)) for user_id in user_ids]
+    began = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - began
+    committed = threads * writes - errors
+    return {"commits_per_second": committed / elapsed, "errors": errors, "seconds": elapsed}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=200)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(_worker(args.threads, args.writes)))
+        return
+
+    for label, pragmas in (("default journaling", "0"), ("WAL + tuned PRAGMAs", "1")):
+        directory = tempfile.mkdtemp(prefix="messecall-bench-")
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{os.path.join(directory, 'bench.db')}",
+            "SQLITE_PRAGMAS": pragmas,
+        }
+        output = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.db_writes",
+                "--worker",
+                "--threads",
+                str(args.threads),
+                "--writes",
+                str(args.writes),
+            ],
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{label:>20}: {result['commits_per_second']:8.0f} commits/s, "
+            f"{result['errors']} 'database is locked' errors"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Poll the public feeds in-process and report requests per second.
+
+Usage: python -m benchmarks.feed_cache [--events 500] [--requests 5000]
+
+Requires httpx (also needed by fastapi.testclient).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import httpx
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="messecall-bench-"))
+    from fastapi.testclient import TestClient
+
+    from app import feeds
+    from app.main import app
+
+    client = TestClient(app)
+    church = client.post("/churches", json={"name": "Bench", "address": "-"}).json()
+    start = datetime(2026, 1, 4, 10)
+    for index in range(args.events):
+        client.post(
+            "/events",
+            json={
+                "church_id": church["id"],
+                "type": "Sonntagsmesse",
+                "start_time": (start + timedelta(days=7 * index)).isoformat(),
+                "end_time": (start + timedelta(days=7 * index, hours=1)).isoformat(),
+                "location": "Hauptkirche",
+                "is_public": True,
+                "description": "Hochamt mit Chor, Orgel; anschließend Kirchencafé",
+            },
+        )
+
+    url = f"/public/churches/{church['id']}/events.ics"
+    etag = client.get(url).headers["etag"]
+    asyncio.run(_poll(app, url, etag, args.requests, feeds))
+
+
+async def _poll(app, url: str, etag: str, requests: int, feeds) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def uncached() -> None:
+            feeds.cache.clear()
+            await client.get(url)
+
+        scenarios = {
+            "uncached": (uncached, max(1, requests // 20)),
+            "cached": (lambda: client.get(url), requests),
+            "conditional (304)": (
+                lambda: client.get(url, headers={"If-None-Match": etag}),
+                requests,
+            ),
+        }
+        for name, (poll, count) in scenarios.items():
+            began = time.perf_counter()
+            for _ in range(count):
+                await poll()
+            elapsed = time.perf_counter() - began
+            print(f"{name:>18}: {count / elapsed:8.0f} req/s ({elapsed / count * 1000:.2f} ms/req)")
+
+
+if __name__ == "__main__":
+    main()
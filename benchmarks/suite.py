@@ -0,0 +1,341 @@
+"""Synthetic-load benchmarks for the matcher, its loaders, ICS rendering and the hot API routes.
+
+Usage: python -m benchmarks.suite [--churches 3] [--servers 40] [--weeks 26] [--seed 7]
+                                  [--iterations 30] [--only matcher,routes]
+                                  [--output results.json]
+                                  [--baseline benchmarks/baseline.json [--save-baseline]]
+                                  [--tolerance 0.25]
+
+Every run seeds a fresh SQLite database in a temporary directory (see
+benchmarks/synthetic.py) and reports p50/p95 latency, throughput and SQL
+statements per call. Routes go through an in-process TestClient. With
+--baseline the results are compared against a stored JSON file; a case
+regresses when its p95 grows by more than the tolerance or it issues more
+queries, and the process exits with status 1. --save-baseline writes the
+current run to that file instead.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from typing import Callable
+
+NOISE_FLOOR_MS = 1.0
+
+
+class QueryCounter:
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(self, *args) -> None:
+        self.count += 1
+
+    def attach(self, *engines) -> None:
+        from sqlalchemy import event
+
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self)
+
+
+class Case:
+    def __init__(
+        self,
+        name: str,
+        group: str,
+        run: Callable[[int], object],
+        setup: Callable[[int], None] | None = None,
+        iterations: int | None = None,
+    ) -> None:
+        self.name = name
+        self.group = group
+        self.run = run
+        self.setup = setup
+        self.iterations = iterations
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def measure(case: Case, iterations: int, counter: QueryCounter) -> dict:
+    iterations = case.iterations or iterations
+    timings: list[float] = []
+    queries = 0
+    if case.setup:
+        case.setup(-1)
+    case.run(-1)
+    for index in range(iterations):
+        if case.setup:
+            case.setup(index)
+        counter.count = 0
+        began = time.perf_counter()
+        case.run(index)
+        timings.append((time.perf_counter() - began) * 1000)
+        queries += counter.count
+    total = sum(timings)
+    return {
+        "iterations": iterations,
+        "p50_ms": round(_percentile(timings, 0.5), 3),
+        "p95_ms": round(_percentile(timings, 0.95), 3),
+        "mean_ms": round(total / iterations, 3),
+        "throughput_per_s": round(iterations / (total / 1000), 1) if total else None,
+        "queries_per_call": round(queries / iterations, 2),
+    }
+
+
+def build_cases(dataset, client, db) -> list[Case]:
+    from app import availability, conflicts, feeds, models, recurrence, services
+
+    church_id = dataset.church_ids[0]
+    upcoming = dataset.upcoming_event_ids(church_id)
+    events = db.query(models.Event).filter(models.Event.id.in_(upcoming)).all()
+    events.sort(key=lambda event: (event.start_time, event.id))
+    window_start = dataset.midpoint
+    window_end = window_start + timedelta(weeks=4)
+
+    def pick(index: int) -> models.Event:
+        return events[index % len(events)]
+
+    def cold_availability(index: int) -> None:
+        availability.invalidate(church_id)
+
+    def public_events():
+        return (
+            db.query(models.Event)
+            .filter(models.Event.church_id == church_id, models.Event.is_public.is_(True))
+            .order_by(models.Event.start_time, models.Event.id)
+            .all()
+        )
+
+    def public_series():
+        return (
+            db.query(models.EventSeries)
+            .filter(
+                models.EventSeries.church_id == church_id,
+                models.EventSeries.is_public.is_(True),
+            )
+            .all()
+        )
+
+    def uncached_feed(index: int) -> None:
+        feeds.cache.clear()
+
+    period = {"from": window_start.isoformat(), "to": window_end.isoformat()}
+    return [
+        Case(
+            "suggest_assignments",
+            "matcher",
+            lambda index: services.suggest_assignments(db, pick(index)),
+        ),
+        Case(
+            "suggest_church_plan (4 weeks)",
+            "matcher",
+            lambda index: services.suggest_church_plan(db, church_id, window_start, window_end),
+        ),
+        Case(
+            "_assignment_counts",
+            "loaders",
+            lambda index: services._assignment_counts(db, church_id),
+        ),
+        Case(
+            "_load_availability (warm index)",
+            "loaders",
+            lambda index: services._load_availability(db, pick(index)),
+        ),
+        Case(
+            "_load_availability (cold index)",
+            "loaders",
+            lambda index: services._load_availability(db, pick(index)),
+            cold_availability,
+        ),
+        Case(
+            "recurrence.expand (4 weeks)",
+            "loaders",
+            lambda index: recurrence.expand(db, church_id, window_start, window_end),
+        ),
+        Case(
+            "conflicts.find (season)",
+            "loaders",
+            lambda index: conflicts.find(db, church_id),
+        ),
+        Case(
+            "build_public_events_ics",
+            "ics",
+            lambda index: services.build_public_events_ics(public_events(), public_series()),
+        ),
+        Case(
+            "GET /events",
+            "routes",
+            lambda index: client.get("/events", params={"church_id": church_id, "limit": 100}),
+        ),
+        Case(
+            "GET /assignments",
+            "routes",
+            lambda index: client.get(
+                "/assignments", params={"church_id": church_id, "limit": 100}
+            ),
+        ),
+        Case(
+            "GET /churches/{id}/calendar",
+            "routes",
+            lambda index: client.get(f"/churches/{church_id}/calendar", params=period),
+        ),
+        Case(
+            "POST /events/{id}/suggestions",
+            "routes",
+            lambda index: client.post(f"/events/{pick(index).id}/suggestions"),
+        ),
+        Case(
+            "POST /churches/{id}/plans/suggestions",
+            "routes",
+            lambda index: client.post(f"/churches/{church_id}/plans/suggestions", params=period),
+        ),
+        Case(
+            "GET /public/.../events.ics (uncached)",
+            "routes",
+            lambda index: client.get(f"/public/churches/{church_id}/events.ics"),
+            uncached_feed,
+        ),
+        Case(
+            "GET /public/.../events.ics (cached)",
+            "routes",
+            lambda index: client.get(f"/public/churches/{church_id}/events.ics"),
+        ),
+        # Rolls back after every call, so it runs last to keep the loaded events fresh.
+        Case(
+            "repair_plan (dry run)",
+            "matcher",
+            lambda index: (
+                services.repair_plan(db, church_id, window_start, commit=False),
+                db.rollback(),
+            ),
+        ),
+    ]
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions: list[str] = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        slower = current["p95_ms"] - previous["p95_ms"]
+        if slower > NOISE_FLOOR_MS and current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p95 {previous['p95_ms']:.2f} ms -> {current['p95_ms']:.2f} ms"
+            )
+        if current["queries_per_call"] > previous["queries_per_call"]:
+            regressions.append(
+                f"{name}: queries {previous['queries_per_call']:g} -> "
+                f"{current['queries_per_call']:g} per call"
+            )
+    return regressions
+
+
+def report(results: dict, baseline: dict | None) -> None:
+    print(
+        f"{'case':<40} {'p50 ms':>9} {'p95 ms':>9} {'ops/s':>9} {'queries':>8}"
+        + (f" {'p95 vs base':>12}" if baseline else "")
+    )
+    for name, result in results.items():
+        line = (
+            f"{name:<40} {result['p50_ms']:9.2f} {result['p95_ms']:9.2f} "
+            f"{result['throughput_per_s'] or 0:9.0f} {result['queries_per_call']:8g}"
+        )
+        previous = (baseline or {}).get(name)
+        if previous and previous["p95_ms"]:
+            change = (result["p95_ms"] / previous["p95_ms"] - 1) * 100
+            line += f" {change:+11.1f}%"
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--churches", type=int, default=3)
+    parser.add_argument("--servers", type=int, default=40)
+    parser.add_argument("--weeks", type=int, default=26)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--only", default="", help="comma-separated groups or case names")
+    parser.add_argument("--output")
+    parser.add_argument("--baseline")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="messecall-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    os.environ["NOTIFICATION_WORKER"] = "0"
+    from fastapi.testclient import TestClient
+
+    from app.database import SessionLocal, async_engine, engine
+    from app.main import app
+    from benchmarks import synthetic
+
+    db = SessionLocal()
+    began = time.perf_counter()
+    dataset = synthetic.generate(db, args.seed, args.churches, args.servers, args.weeks)
+    print(
+        f"seeded {args.churches} churches x {args.servers} servers x {args.weeks} weeks "
+        f"(seed {args.seed}) in {time.perf_counter() - began:.1f} s"
+    )
+
+    counter = QueryCounter()
+    counter.attach(engine, async_engine.sync_engine)
+    client = TestClient(app)
+    selected = {item.strip() for item in args.only.split(",") if item.strip()}
+    results: dict[str, dict] = {}
+    for case in build_cases(dataset, client, db):
+        if selected and case.group not in selected and case.name not in selected:
+            continue
+        results[case.name] = measure(case, args.iterations, counter)
+    db.close()
+
+    meta = {
+        "seed": args.seed,
+        "churches": args.churches,
+        "servers": args.servers,
+        "weeks": args.weeks,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+    }
+    baseline: dict | None = None
+    if args.baseline and not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as handle:
+            stored = json.load(handle)
+        if stored.get("meta", {}).get("seed") != args.seed or any(
+            stored.get("meta", {}).get(key) != meta[key] for key in ("churches", "servers", "weeks")
+        ):
+            print("warning: baseline was recorded with a different data set")
+        baseline = stored.get("results", {})
+
+    report(results, baseline)
+    payload = {"meta": meta, "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(payload, handle, indent=2)
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as handle:
+            json.dump(payload, handle, indent=2)
+        print(f"baseline written to {args.baseline}")
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
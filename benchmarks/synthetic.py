@@ -0,0 +1,235 @@
+"""Seeded synthetic data for the benchmark suite.
+
+Builds N churches with servers, a season of services, availability windows and
+blackouts, preferences (including mutual partner pairs), an approved
+assignment history for the first half of the season and some swap history.
+The same seed always produces the same rows.
+"""
+from __future__ import annotations
+
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+SEASON_START = datetime(2026, 1, 3)
+LOCATIONS = ("Hauptkirche", "St. Josef", "Kapelle", "Krankenhauskapelle")
+EVENT_TYPES = ("Sonntagsmesse", "Vorabendmesse", "Werktagsmesse", "Hochzeit", "Taufe")
+WEEKDAYS = ("Montag", "Dienstag", "Mittwoch", "Donnerstag", "Freitag", "Samstag", "Sonntag")
+TIME_RANGES = ("morgens", "vormittags", "nachmittags", "abends", "09:00-12:00", "17:00-20:00")
+
+
+class Dataset:
+    def __init__(self, seed: int, churches: int, servers: int, weeks: int) -> None:
+        self.seed = seed
+        self.churches = churches
+        self.servers = servers
+        self.weeks = weeks
+        self.church_ids: list[int] = []
+        self.user_ids: dict[int, list[int]] = {}
+        self.event_ids: dict[int, list[int]] = {}
+
+    @property
+    def midpoint(self) -> datetime:
+        return SEASON_START + timedelta(weeks=self.weeks // 2)
+
+    @property
+    def season_end(self) -> datetime:
+        return SEASON_START + timedelta(weeks=self.weeks)
+
+    def upcoming_event_ids(self, church_id: int) -> list[int]:
+        events = self.event_ids[church_id]
+        return events[len(events) // 2 :]
+
+
+def _season_events(rng: random.Random, church_id: int, weeks: int) -> list[dict]:
+    rows: list[dict] = []
+    for week in range(weeks):
+        saturday = SEASON_START + timedelta(weeks=week)
+        services = [
+            (saturday + timedelta(hours=18), "Vorabendmesse", 2),
+            (saturday + timedelta(days=1, hours=9, minutes=30), "Sonntagsmesse", 4),
+            (saturday + timedelta(days=1, hours=11), "Sonntagsmesse", 3),
+        ]
+        for offset in rng.sample(range(2, 7), 2):
+            services.append((saturday + timedelta(days=offset, hours=8), "Werktagsmesse", 1))
+        if rng.random() < 0.3:
+            services.append(
+                (saturday + timedelta(hours=rng.choice((11, 14))), rng.choice(EVENT_TYPES[3:]), 2)
+            )
+        for start, event_type, slots in services:
+            rows.append(
+                {
+                    "church_id": church_id,
+                    "type": event_type,
+                    "start_time": start,
+                    "end_time": start + timedelta(hours=1),
+                    "location": rng.choice(LOCATIONS[:3]),
+                    "required_slots": slots,
+                    "requires_experienced": event_type == "Hochzeit",
+                    "is_public": event_type != "Taufe",
+                    "description": f"{event_type} – synthetisch",
+                }
+            )
+    return rows
+
+
+def _availability(rng: random.Random, user_id: int, weeks: int) -> list[dict]:
+    rows = [
+        {
+            "user_id": user_id,
+            "start_time": SEASON_START,
+            "end_time": SEASON_START + timedelta(weeks=weeks),
+            "available": True,
+            "note": "",
+        }
+    ]
+    for _ in range(rng.randint(0, 4)):
+        start = SEASON_START + timedelta(days=rng.randrange(weeks * 7))
+        rows.append(
+            {
+                "user_id": user_id,
+                "start_time": start,
+                "end_time": start + timedelta(days=rng.randint(1, 14)),
+                "available": False,
+                "note": "Urlaub",
+            }
+        )
+    return rows
+
+
+def _preference(rng: random.Random, user_id: int, partner_id: int | None) -> dict:
+    return {
+        "user_id": user_id,
+        "preferred_weekdays": rng.sample(WEEKDAYS, rng.randint(0, 3)),
+        "preferred_time_ranges": rng.sample(TIME_RANGES, rng.randint(0, 2)),
+        "preferred_locations": rng.sample(LOCATIONS[:3], rng.randint(0, 2)),
+        "partner_user_ids": [partner_id] if partner_id else [],
+        "favorite_event_types": rng.sample(EVENT_TYPES, rng.randint(0, 2)),
+    }
+
+
+def generate(
+    db: Session,
+    seed: int = 7,
+    churches: int = 3,
+    servers: int = 40,
+    weeks: int = 26,
+) -> Dataset:
+    from app import fairness, models
+
+    rng = random.Random(seed)
+    dataset = Dataset(seed, churches, servers, weeks)
+    for number in range(churches):
+        church = models.Church(name=f"Pfarrei {number + 1}", address=f"Kirchplatz {number + 1}")
+        db.add(church)
+        db.flush()
+        dataset.church_ids.append(church.id)
+
+        db.execute(
+            insert(models.User),
+            [
+                {
+                    "name": f"Messdiener {number + 1}-{index + 1}",
+                    "email": f"server{number}-{index}@bench.invalid",
+                    "role": models.Role.server,
+                    "church_id": church.id,
+                    "experience_level": rng.choice((1, 1, 2, 3)),
+                    "active": rng.random() > 0.05,
+                }
+                for index in range(servers)
+            ],
+        )
+        user_ids = list(
+            db.scalars(
+                select(models.User.id)
+                .where(models.User.church_id == church.id)
+                .order_by(models.User.id)
+            )
+        )
+        dataset.user_ids[church.id] = user_ids
+
+        db.execute(insert(models.Event), _season_events(rng, church.id, weeks))
+        event_rows = db.execute(
+            select(models.Event.id, models.Event.start_time, models.Event.required_slots)
+            .where(models.Event.church_id == church.id)
+            .order_by(models.Event.start_time, models.Event.id)
+        ).all()
+        dataset.event_ids[church.id] = [event_id for event_id, _, _ in event_rows]
+
+        db.execute(
+            insert(models.Availability),
+            [row for user_id in user_ids for row in _availability(rng, user_id, weeks)],
+        )
+        paired = rng.sample(user_ids, len(user_ids) // 5 // 2 * 2)
+        partners: dict[int, int] = {}
+        for first, second in zip(paired[::2], paired[1::2]):
+            partners[first], partners[second] = second, first
+        db.execute(
+            insert(models.Preference),
+            [
+                _preference(rng, user_id, partners.get(user_id))
+                for user_id in user_ids
+                if rng.random() < 0.8
+            ],
+        )
+
+        assignments: list[dict] = []
+        volunteers: list[dict] = []
+        for event_id, start, slots in event_rows:
+            if start >= dataset.midpoint:
+                if rng.random() < 0.2:
+                    volunteers.append({"event_id": event_id, "user_id": rng.choice(user_ids)})
+                continue
+            for user_id in rng.sample(user_ids, slots):
+                assignments.append(
+                    {
+                        "event_id": event_id,
+                        "user_id": user_id,
+                        "status": models.AssignmentStatus.approved,
+                        "source": "algorithm",
+                        "approved_at": start - timedelta(days=7),
+                    }
+                )
+        db.execute(insert(models.Assignment), assignments)
+        if volunteers:
+            db.execute(insert(models.VolunteerInterest), volunteers)
+
+        assignment_ids = list(
+            db.scalars(
+                select(models.Assignment.id)
+                .join(models.Event, models.Assignment.event_id == models.Event.id)
+                .where(models.Event.church_id == church.id)
+            )
+        )
+        swaps = rng.sample(assignment_ids, len(assignment_ids) // 20)
+        if swaps:
+            db.execute(
+                insert(models.SwapRequest),
+                [
+                    {
+                        "assignment_id": assignment_id,
+                        "status": rng.choice((models.SwapStatus.accepted, models.SwapStatus.declined)),
+                        "requested_user_ids": rng.sample(user_ids, 2),
+                        "replacement_user_id": rng.choice(user_ids),
+                    }
+                    for assignment_id in swaps
+                ],
+            )
+        db.execute(
+            insert(models.BackupPool),
+            [
+                {
+                    "user_id": user_id,
+                    "start_time": SEASON_START,
+                    "end_time": dataset.season_end,
+                    "preferred_locations": rng.sample(LOCATIONS[:3], 1),
+                    "active": True,
+                }
+                for user_id in rng.sample(user_ids, max(1, servers // 10))
+            ],
+        )
+        fairness.rebuild(db, church.id, commit=False)
+    db.commit()
+    return dataset
@@ -6,7 +6,7 @@ import AdminPlanning from "./sections/AdminPlanning";
 import ProfilePreferences from "./sections/ProfilePreferences";
 import SwapRequests from "./sections/SwapRequests";
 import Gamification from "./sections/Gamification";
-import { fetchEvents, fetchPublicEvents } from "./api";
+import { fetchDashboard, fetchEvents, fetchPublicEvents } from "./api";
 
 const highlightCards = [
   {
@@ -34,13 +34,14 @@ const App = () => {
   const [publicEvents, setPublicEvents] = useState([]);
   const [churchId, setChurchId] = useState("1");
   const [loading, setLoading] = useState(false);
+  const [dashboard, setDashboard] = useState(null);
 
   useEffect(() => {
     const loadEvents = async () => {
       setLoading(true);
       try {
         const response = await fetchEvents();
-        setEvents(response);
+        setEvents(response.items);
       } catch (error) {
         setEvents([]);
       } finally {
@@ -67,6 +68,28 @@ const App = () => {
     loadPublicEvents();
   }, [churchId]);
 
+  useEffect(() => {
+    const loadDashboard = async () => {
+      if (!churchId) {
+        return;
+      }
+      const from = new Date();
+      const to = new Date(from.getTime() + 28 * 24 * 60 * 60 * 1000);
+      try {
+        const response = await fetchDashboard(
+          churchId,
+          from.toISOString().slice(0, 19),
+          to.toISOString().slice(0, 19)
+        );
+        setDashboard(response);
+      } catch (error) {
+        setDashboard(null);
+      }
+    };
+
+    loadDashboard();
+  }, [churchId]);
+
   const upcomingEvents = events.map((event) => ({
     title: event.title,
     time: new Date(event.start_time).toLocaleString("de-DE", {
@@ -86,7 +109,7 @@ const App = () => {
         onChurchIdChange={setChurchId}
         loading={loading}
       />
-      <AdminPlanning />
+      <AdminPlanning dashboard={dashboard} />
       <ProfilePreferences />
       <SwapRequests />
       <Gamification />
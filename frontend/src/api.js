@@ -8,8 +8,10 @@ const handleResponse = async (response) => {
   return response.json();
 };
 
-export const fetchEvents = async () =>
-  handleResponse(await fetch(`${API_BASE}/events`));
+export const fetchEvents = async (params = {}) => {
+  const query = new URLSearchParams(params).toString();
+  return handleResponse(await fetch(`${API_BASE}/events${query ? `?${query}` : ""}`));
+};
 
 export const fetchPublicEvents = async (churchId) =>
   handleResponse(await fetch(`${API_BASE}/public/churches/${churchId}/events`));
@@ -22,3 +24,11 @@ export const createSwapRequest = async (payload) =>
       body: JSON.stringify(payload)
     })
   );
+
+export const fetchLeaderboard = async (churchId, limit = 10) =>
+  handleResponse(await fetch(`${API_BASE}/churches/${churchId}/leaderboard?limit=${limit}`));
+
+export const fetchDashboard = async (churchId, from, to) => {
+  const query = new URLSearchParams({ from, to }).toString();
+  return handleResponse(await fetch(`${API_BASE}/churches/${churchId}/dashboard?${query}`));
+};
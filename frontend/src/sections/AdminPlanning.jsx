@@ -2,7 +2,14 @@ import React from "react";
 import Card from "../components/Card";
 import Badge from "../components/Badge";
 
-const AdminPlanning = () => (
+const formatEvent = (event) =>
+  `${new Date(event.start_time).toLocaleString("de-DE", {
+    weekday: "short",
+    hour: "2-digit",
+    minute: "2-digit"
+  })} Uhr – ${event.type} (${event.assigned}/${event.required_slots})`;
+
+const AdminPlanning = ({ dashboard }) => (
   <section id="admin" className="section">
     <div className="section__header">
       <div>
@@ -15,13 +22,37 @@ const AdminPlanning = () => (
     </div>
 
     <div className="grid grid--3">
-      <Card title="Offene Dienste" action={<Badge tone="warning">5 offen</Badge>}>
+      <Card
+        title="Offene Dienste"
+        action={
+          <Badge tone="warning">
+            {dashboard ? `${dashboard.understaffed.length} offen` : "5 offen"}
+          </Badge>
+        }
+      >
         <p>Plane weitere Messdiener*innen für kommende Gottesdienste ein.</p>
-        <ul className="list">
-          <li>So, 10:00 Uhr – Hochamt</li>
-          <li>Mi, 18:00 Uhr – Abendmesse</li>
-          <li>Sa, 19:00 Uhr – Jugendmesse</li>
-        </ul>
+        {dashboard ? (
+          <ul className="list">
+            {dashboard.understaffed.slice(0, 3).map((event) => (
+              <li key={`${event.event_id ?? event.series_id}-${event.start_time}`}>
+                {formatEvent(event)}
+              </li>
+            ))}
+          </ul>
+        ) : (
+          <ul className="list">
+            <li>So, 10:00 Uhr – Hochamt</li>
+            <li>Mi, 18:00 Uhr – Abendmesse</li>
+            <li>Sa, 19:00 Uhr – Jugendmesse</li>
+          </ul>
+        )}
+        {dashboard && (
+          <p>
+            {dashboard.filled_slots}/{dashboard.required_slots} Plätze besetzt ·{" "}
+            {dashboard.open_swaps.length} offene Tauschanfragen · {dashboard.absences.length}{" "}
+            Abwesenheiten
+          </p>
+        )}
       </Card>
       <Card title="Backup-Pool" action={<Badge tone="success">8 verfügbar</Badge>}>
         <p>Der Pool ist gut gefüllt. Spare Ressourcen für kurzfristige Ausfälle.</p>
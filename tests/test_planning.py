@@ -0,0 +1,71 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+)
+
+from app import matching, models, services  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+
+SUNDAY = datetime(2026, 3, 8)
+
+
+def _overlaps(first: models.Event, second: models.Event) -> bool:
+    return first.start_time < second.end_time and second.start_time < first.end_time
+
+
+def test_chained_events_share_servers_when_they_do_not_overlap():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        church = models.Church(name="Kette", address="Kirchplatz 2")
+        db.add(church)
+        db.flush()
+        users = [
+            models.User(
+                name=f"Kette {index}",
+                email=f"kette-{index}@example.org",
+                role=models.Role.server,
+                church_id=church.id,
+            )
+            for index in range(2)
+        ]
+        db.add_all(users)
+        db.flush()
+        for user in users:
+            db.add(
+                models.Availability(
+                    user_id=user.id,
+                    start_time=SUNDAY,
+                    end_time=SUNDAY + timedelta(days=1),
+                )
+            )
+        # 9:00-10:00 overlaps 9:30-10:30, which overlaps 10:15-11:15; the first and last do not.
+        events = [
+            models.Event(
+                church_id=church.id,
+                type="Sonntagsmesse",
+                start_time=SUNDAY + timedelta(hours=9, minutes=offset),
+                end_time=SUNDAY + timedelta(hours=10, minutes=offset),
+                location="Hauptkirche",
+                required_slots=1,
+            )
+            for offset in (0, 30, 75)
+        ]
+        db.add_all(events)
+        db.commit()
+        assert len(matching.overlap_clusters(events)) == 1
+
+        plan = services.suggest_church_plan(
+            db, church.id, SUNDAY, SUNDAY + timedelta(days=1)
+        )
+        picks = {event.id: [item.user_id for item in candidates] for event, candidates in plan}
+        assert all(len(picks[event.id]) == 1 for event in events)
+        for first in events:
+            for second in events:
+                if first is not second and _overlaps(first, second):
+                    assert picks[first.id] != picks[second.id]
+    finally:
+        db.close()
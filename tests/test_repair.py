@@ -0,0 +1,98 @@
+import os
+import tempfile
+
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+)
+os.environ.setdefault("NOTIFICATION_WORKER", "0")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+
+client = TestClient(app)
+
+
+def _ok(response):
+    assert response.status_code < 300, response.text
+    return response.json()
+
+
+def test_repair_declines_swaps_on_reassigned_assignments():
+    church = _ok(client.post("/churches", json={"name": "Reparatur", "address": "Markt 3"}))
+    users = [
+        _ok(
+            client.post(
+                "/users",
+                json={
+                    "name": f"Reparatur {index}",
+                    "email": f"reparatur-{index}@example.org",
+                    "role": "server",
+                    "church_id": church["id"],
+                },
+            )
+        )
+        for index in range(3)
+    ]
+    for user in users:
+        _ok(
+            client.post(
+                "/availability",
+                json={
+                    "user_id": user["id"],
+                    "start_time": "2030-05-01T00:00:00",
+                    "end_time": "2030-06-01T00:00:00",
+                },
+            )
+        )
+    event = _ok(
+        client.post(
+            "/events",
+            json={
+                "church_id": church["id"],
+                "type": "Sonntagsmesse",
+                "start_time": "2030-05-12T10:00:00",
+                "end_time": "2030-05-12T11:00:00",
+                "location": "Hauptkirche",
+                "required_slots": 1,
+            },
+        )
+    )
+    owner = users[0]
+    assignment = _ok(
+        client.post("/assignments", json={"event_id": event["id"], "user_id": owner["id"]})
+    )
+    swap = _ok(
+        client.post(
+            "/swap-requests", json={"assignment_id": assignment["id"], "requested_user_ids": []}
+        )
+    )
+    _ok(
+        client.post(
+            "/availability",
+            json={
+                "user_id": owner["id"],
+                "start_time": "2030-05-12T00:00:00",
+                "end_time": "2030-05-13T00:00:00",
+                "available": False,
+            },
+        )
+    )
+
+    changes = _ok(
+        client.post(
+            f"/churches/{church['id']}/plans/repair", params={"from": "2030-05-01T00:00:00"}
+        )
+    )
+    assert [change["assignment_id"] for change in changes] == [assignment["id"]]
+    new_owner = changes[0]["user_id"]
+    assert new_owner not in (None, owner["id"])
+
+    other = next(user["id"] for user in users if user["id"] not in (owner["id"], new_owner))
+    assert _ok(client.get(f"/users/{other}/open-swaps"))["items"] == []
+    response = client.post(
+        f"/swap-requests/{swap['id']}/accept", json={"replacement_user_id": other}
+    )
+    assert response.status_code == 409, response.text
+    assignments = _ok(client.get("/assignments", params={"event_id": event["id"]}))["items"]
+    assert [item["user_id"] for item in assignments] == [new_owner]
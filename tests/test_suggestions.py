@@ -0,0 +1,110 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+)
+
+from sqlalchemy import event  # noqa: E402
+
+from app import availability, models, preferences, services  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+
+START = datetime(2026, 3, 1, 10)
+
+
+def _seed_church(db, name: str, servers: int) -> models.Event:
+    church = models.Church(name=name, address="Kirchplatz 1")
+    db.add(church)
+    db.flush()
+    users = [
+        models.User(
+            name=f"{name} {index}",
+            email=f"{name.lower()}-{index}@example.org",
+            role=models.Role.server,
+            church_id=church.id,
+            experience_level=1 + index % 3,
+        )
+        for index in range(servers)
+    ]
+    db.add_all(users)
+    db.flush()
+    past = models.Event(
+        church_id=church.id,
+        type="Sonntagsmesse",
+        start_time=START - timedelta(days=7),
+        end_time=START - timedelta(days=7, hours=-1),
+        location="Hauptkirche",
+    )
+    upcoming = models.Event(
+        church_id=church.id,
+        type="Sonntagsmesse",
+        start_time=START,
+        end_time=START + timedelta(hours=1),
+        location="Hauptkirche",
+        required_slots=3,
+    )
+    db.add_all([past, upcoming])
+    db.flush()
+    for index, user in enumerate(users):
+        db.add(
+            models.Availability(
+                user_id=user.id,
+                start_time=START - timedelta(days=30),
+                end_time=START + timedelta(days=30),
+            )
+        )
+        db.add(
+            models.Preference(
+                user_id=user.id,
+                preferred_locations=["Hauptkirche"],
+                partner_user_ids=[users[index ^ 1].id] if index ^ 1 < servers else [],
+            )
+        )
+        if index % 2:
+            db.add(
+                models.Assignment(
+                    event_id=past.id, user_id=user.id, status=models.AssignmentStatus.approved
+                )
+            )
+        if index % 4 == 0:
+            db.add(models.VolunteerInterest(event_id=upcoming.id, user_id=user.id))
+    db.commit()
+    return upcoming
+
+
+def _count_queries(db, target: models.Event) -> int:
+    statements = []
+
+    def record(*args) -> None:
+        statements.append(args[2])
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        services.suggest_assignments(db, target)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return len(statements)
+
+
+def _cold_and_warm(db, target: models.Event) -> tuple[int, int]:
+    availability.invalidate()
+    preferences.invalidate()
+    db.expire_all()
+    return _count_queries(db, target), _count_queries(db, target)
+
+
+def test_suggestions_issue_constant_queries_per_roster_size():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        small = _seed_church(db, "Klein", 4)
+        large = _seed_church(db, "Gross", 60)
+        small_cold, small_warm = _cold_and_warm(db, small)
+        large_cold, large_warm = _cold_and_warm(db, large)
+        assert small_cold == large_cold
+        assert small_warm == large_warm
+        assert small_warm <= small_cold
+    finally:
+        db.close()